@@ -0,0 +1,198 @@
+"""Local stand-ins for every upstream server.py talks to.
+
+One threaded HTTP server answers under these prefixes:
+    /owm     OpenWeatherMap      (OPENWEATHER_BASE_URL)
+    /fd      football-data.org   (FOOTBALLDATA_BASE_URL)
+    /cal     Calendarific        (CALENDARIFIC_BASE_URL)
+    /ddg     DuckDuckGo          (DUCKDUCKGO_BASE_URL)
+    /openai  OpenAI Responses    (OPENAI_BASE_URL=<base>/openai/v1)
+
+Payloads come from the recorded fixtures in bench/fixtures. Each upstream has
+its own latency (seconds, with +-25% jitter) and error rate, and every call is
+counted. GET /_stats returns the counters and POST /_reset clears them.
+"""
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+DEFAULT_LATENCY = {'owm': 0.08, 'fd': 0.15, 'cal': 0.2, 'ddg': 0.12, 'openai': 0.6}
+
+REPLY = (
+    "Here is a short answer.\n\n1. First, a summary line.\n2. Then a few details.\n"
+    "3. Finally an example.\n\nLet me know if you want more detail."
+)
+
+
+def _load(name):
+    with open(os.path.join(FIXTURES, f'{name}.json'), 'rb') as f:
+        return f.read()
+
+
+class FakeUpstreams:
+    def __init__(self, host='127.0.0.1', port=0, latency=None, error_rate=0.0, stream_chunk_delay=0.01):
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.error_rate = error_rate if isinstance(error_rate, dict) else {k: error_rate for k in self.latency}
+        self.stream_chunk_delay = stream_chunk_delay
+        self.payloads = {name: _load(name) for name in ('weather', 'standings', 'matches', 'live', 'holidays', 'duckduckgo')}
+        self.calls = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def env(self):
+        """Environment variables that point server.py at these fakes."""
+        return {
+            'OPENWEATHER_BASE_URL': f'{self.base_url}/owm',
+            'FOOTBALLDATA_BASE_URL': f'{self.base_url}/fd',
+            'CALENDARIFIC_BASE_URL': f'{self.base_url}/cal',
+            'DUCKDUCKGO_BASE_URL': f'{self.base_url}/ddg',
+            'OPENAI_BASE_URL': f'{self.base_url}/openai/v1',
+            'OPENAI_API_KEY': 'bench',
+            'OPENWEATHER_API_KEY': 'bench',
+            'FOOTBALLDATA_API_KEY': 'bench',
+            'CALENDARIFIC_API_KEY': 'bench',
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-upstreams', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {'calls': dict(self.calls), 'errors': dict(self.errors)}
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.errors.clear()
+
+    def _count(self, upstream, error):
+        with self._lock:
+            self.calls[upstream] = self.calls.get(upstream, 0) + 1
+            if error:
+                self.errors[upstream] = self.errors.get(upstream, 0) + 1
+
+    def _handler_class(self):
+        fakes = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fakes._dispatch(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                fakes._dispatch(self, body)
+
+        return Handler
+
+    def _send(self, h, status, body, content_type='application/json', headers=None):
+        h.send_response(status)
+        h.send_header('Content-Type', content_type)
+        h.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            h.send_header(k, v)
+        h.end_headers()
+        h.wfile.write(body)
+
+    def _dispatch(self, h, body):
+        parts = urlsplit(h.path)
+        path = parts.path
+        if path == '/_stats':
+            return self._send(h, 200, json.dumps(self.stats()).encode())
+        if path == '/_reset':
+            self.reset()
+            return self._send(h, 200, b'{}')
+
+        upstream = path.strip('/').split('/', 1)[0]
+        if upstream not in self.latency:
+            return self._send(h, 404, b'{"error": "unknown upstream"}')
+        failed = random.random() < self.error_rate.get(upstream, 0.0)
+        self._count(upstream, failed)
+        time.sleep(self.latency[upstream] * random.uniform(0.75, 1.25))
+        if failed:
+            status = 429 if upstream == 'openai' else 503
+            return self._send(h, status, b'{"error": "injected failure"}', headers={'retry-after-ms': '100'})
+
+        if upstream == 'openai':
+            return self._openai(h, body or {})
+        if upstream == 'owm':
+            name = parse_qs(parts.query).get('q', ['London'])[0]
+            payload = json.loads(self.payloads['weather'])
+            payload['name'] = name.title()
+            return self._send(h, 200, json.dumps(payload).encode())
+        if upstream == 'fd':
+            if path.endswith('/standings'):
+                return self._send(h, 200, self.payloads['standings'])
+            if 'LIVE' in parts.query:
+                return self._send(h, 200, self.payloads['live'])
+            return self._send(h, 200, self.payloads['matches'])
+        if upstream == 'cal':
+            return self._send(h, 200, self.payloads['holidays'])
+        return self._send(h, 200, self.payloads['duckduckgo'])
+
+    def _openai(self, h, body):
+        rate_headers = {
+            'x-ratelimit-remaining-requests': '4999',
+            'x-ratelimit-reset-requests': '12ms',
+            'x-ratelimit-remaining-tokens': '3999000',
+            'x-ratelimit-reset-tokens': '15ms',
+        }
+        model = body.get('model', 'gpt-4o-mini')
+        message = {
+            'id': 'msg_bench', 'type': 'message', 'status': 'completed', 'role': 'assistant',
+            'content': [{'type': 'output_text', 'text': REPLY, 'annotations': []}],
+        }
+        usage = {
+            'input_tokens': 900, 'output_tokens': 60, 'total_tokens': 960,
+            'input_tokens_details': {'cached_tokens': 0}, 'output_tokens_details': {'reasoning_tokens': 0},
+        }
+        response = {
+            'id': 'resp_bench', 'object': 'response', 'created_at': int(time.time()), 'status': 'completed',
+            'model': model, 'output': [message], 'usage': usage, 'parallel_tool_calls': True,
+            'tool_choice': 'auto', 'tools': [],
+        }
+        if not body.get('stream'):
+            return self._send(h, 200, json.dumps(response).encode(), headers=rate_headers)
+
+        h.send_response(200)
+        h.send_header('Content-Type', 'text/event-stream')
+        h.send_header('Connection', 'close')
+        for k, v in rate_headers.items():
+            h.send_header(k, v)
+        h.end_headers()
+        seq = 0
+        for word in REPLY.split(' '):
+            event = {'type': 'response.output_text.delta', 'item_id': 'msg_bench', 'output_index': 0,
+                     'content_index': 0, 'delta': word + ' ', 'sequence_number': seq, 'logprobs': []}
+            h.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode())
+            h.wfile.flush()
+            seq += 1
+            time.sleep(self.stream_chunk_delay)
+        done = {'type': 'response.completed', 'response': response, 'sequence_number': seq}
+        h.wfile.write(f"event: response.completed\ndata: {json.dumps(done)}\n\n".encode())
+        h.wfile.flush()
+        h.close_connection = True
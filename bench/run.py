@@ -0,0 +1,298 @@
+"""Load-test Quickcify against local upstream fakes.
+
+    python -m bench.run                              # all scenarios, 10s each
+    python -m bench.run -s live-poll -c 64 -d 20
+    python -m bench.run --latency openai=1.5 --error-rate 0.05 -o results.json
+
+For every scenario the app is started fresh under gunicorn (so the cache starts
+cold) with its upstream base URLs pointed at bench.fakes. The scenario's request
+mix is then replayed from `concurrency` client threads. The results go to a
+JSON file so runs can be compared across commits: per-label latency
+percentiles, throughput, status codes, upstream call counts and cache hit ratio.
+"""
+import argparse
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from bench.fakes import FakeUpstreams
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CITIES = ['London', 'Paris', 'Lagos', 'Tokyo', 'New York', 'Berlin', 'Madrid', 'Sydney']
+QUESTIONS = [
+    'Explain how HTTPS certificates are validated',
+    'Write a Python function that reverses a linked list',
+    'What are the pros and cons of SQLite vs Postgres for a small app?',
+    'hey, how are you?',
+    'Summarize the difference between threads and processes',
+    'How to set up SSH keys on Linux step by step',
+]
+# upstream requests one cache miss costs, used to estimate the hit ratio
+UPSTREAM_COST = {'weather': 1, 'league': 2, 'live': 1, 'holidays': 1, 'search': 1}
+
+
+def _chat(i, stream=False):
+    body = {'message': QUESTIONS[i % len(QUESTIONS)], 'model': 'gpt-4.1-mini', 'history': []}
+    return ('chat-stream' if stream else 'chat', 'POST', '/chat?stream=1' if stream else '/chat', body)
+
+
+def _chat_heavy(i):
+    slot = i % 10
+    if slot < 6:
+        return _chat(i)
+    if slot < 8:
+        return _chat(i, stream=True)
+    return ('league', 'GET', '/api/league?comp=PL', None)
+
+
+def _live_poll(i):
+    return ('live', 'GET', ['/api/live-scores', '/api/live-scores?comp=PL', '/api/live-scores?comp=PD'][i % 3], None)
+
+
+def _cache_cold(i):
+    slot = i % 3
+    if slot == 0:
+        return ('weather', 'GET', f'/api/weather?city=city{i}', None)
+    if slot == 1:
+        return ('search', 'GET', f'/api/search?q=term{i}', None)
+    return ('holidays', 'GET', f'/api/holidays?country=C{i}&year=2026', None)
+
+
+WARM_SET = [
+    ('weather', 'GET', f'/api/weather?city={c}', None) for c in CITIES[:4]
+] + [
+    ('league', 'GET', '/api/league?comp=PL', None),
+    ('league', 'GET', '/api/league?comp=PD', None),
+    ('holidays', 'GET', '/api/holidays?country=US&year=2026', None),
+    ('search', 'GET', '/api/search?q=python', None),
+]
+
+
+def _cache_warm(i):
+    return WARM_SET[i % len(WARM_SET)]
+
+
+SCENARIOS = {
+    'chat-heavy': (_chat_heavy, False),
+    'live-poll': (_live_poll, False),
+    'cache-cold': (_cache_cold, False),
+    'cache-warm': (_cache_warm, True),
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(values_ms):
+    values = sorted(values_ms)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 2),
+        'p50': round(percentile(values, 50), 2),
+        'p95': round(percentile(values, 95), 2),
+        'p99': round(percentile(values, 99), 2),
+        'max': round(values[-1], 2),
+    }
+
+
+class App:
+    """The Flask app under gunicorn, as a subprocess."""
+
+    def __init__(self, env, workers, threads):
+        self.port = _free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        cmd = [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+            '-b', f'127.0.0.1:{self.port}', '-w', str(workers), '--threads', str(threads),
+            '--access-logfile', os.devnull,
+        ]
+        self.proc = subprocess.Popen(cmd, cwd=ROOT, env={**os.environ, **env},
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def wait_ready(self, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError('app exited during startup:\n' + self.proc.stderr.read().decode(errors='replace'))
+            try:
+                if httpx.get(f'{self.base_url}/readyz', timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError('app did not become ready')
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=35)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+def _issue(client, spec):
+    label, method, path, body = spec
+    started = time.perf_counter()
+    ttfb = None
+    if label == 'chat-stream':
+        with client.stream(method, path, json=body) as resp:
+            for _ in resp.iter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - started
+            status = resp.status_code
+    elif method == 'POST':
+        status = client.post(path, json=body).status_code
+    else:
+        status = client.get(path).status_code
+    return status, time.perf_counter() - started, ttfb
+
+
+def run_load(base_url, make_request, concurrency, duration, total):
+    counter = itertools.count()
+    lock = threading.Lock()
+    samples = []  # (label, status, seconds, ttfb)
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            while True:
+                i = next(counter)
+                if (total and i >= total) or (not total and time.perf_counter() >= deadline):
+                    return
+                spec = make_request(i)
+                try:
+                    status, elapsed, ttfb = _issue(client, spec)
+                except httpx.HTTPError as e:
+                    status, elapsed, ttfb = type(e).__name__, 0.0, None
+                with lock:
+                    samples.append((spec[0], status, elapsed, ttfb))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - started
+
+
+def report(samples, wall, upstream_stats):
+    ok = [s for s in samples if isinstance(s[1], int) and s[1] < 400]
+    by_label = {}
+    for label, status, elapsed, ttfb in samples:
+        entry = by_label.setdefault(label, {'latency': [], 'ttfb': [], 'status': {}})
+        entry['status'][str(status)] = entry['status'].get(str(status), 0) + 1
+        if isinstance(status, int):
+            entry['latency'].append(elapsed * 1000)
+        if ttfb is not None:
+            entry['ttfb'].append(ttfb * 1000)
+
+    api_requests = sum(UPSTREAM_COST.get(s[0], 0) for s in ok)
+    api_upstream = sum(n for name, n in upstream_stats['calls'].items() if name != 'openai')
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(ok),
+        'duration_s': round(wall, 3),
+        'throughput_rps': round(len(samples) / wall, 2) if wall else None,
+        'latency_ms': summarize([s[2] * 1000 for s in samples if isinstance(s[1], int)]),
+        'endpoints': {
+            label: {
+                'status': e['status'],
+                'latency_ms': summarize(e['latency']),
+                **({'ttfb_ms': summarize(e['ttfb'])} if e['ttfb'] else {}),
+            }
+            for label, e in sorted(by_label.items())
+        },
+        'upstream_calls': upstream_stats['calls'],
+        'upstream_errors': upstream_stats['errors'],
+        # estimated: 1 - (third-party calls made / calls needed if nothing were cached)
+        'cache_hit_ratio': round(1 - api_upstream / api_requests, 4) if api_requests else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--scenarios', default=','.join(SCENARIOS), help='comma separated: ' + ', '.join(SCENARIOS))
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('-n', '--requests', type=int, default=0, help='fixed request count instead of --duration')
+    parser.add_argument('-w', '--workers', type=int, default=2)
+    parser.add_argument('-t', '--threads', type=int, default=16)
+    parser.add_argument('--latency', action='append', default=[], metavar='UPSTREAM=SECONDS',
+                        help='per-upstream latency override (owm, fd, cal, ddg, openai)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of upstream calls that fail')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE', help='extra app environment')
+    parser.add_argument('-o', '--out', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    latency = {k: float(v) for k, v in (item.split('=', 1) for item in args.latency)}
+    fakes = FakeUpstreams(latency=latency, error_rate=args.error_rate).start()
+    env = {'PREFETCH_ENABLED': '0', 'CHAT_CACHE_ENABLED': '0', **fakes.env()}
+    env.update(item.split('=', 1) for item in args.env)
+
+    results = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'concurrency': args.concurrency, 'duration_s': args.duration, 'requests': args.requests,
+            'workers': args.workers, 'threads': args.threads, 'upstream_latency_s': fakes.latency,
+            'error_rate': args.error_rate, 'env': {k: v for k, v in env.items() if not k.endswith('_KEY')},
+        },
+        'scenarios': {},
+    }
+    try:
+        for name in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+            make_request, prime = SCENARIOS[name]
+            app = App(env, args.workers, args.threads)
+            try:
+                app.wait_ready()
+                if prime:
+                    # every worker should see a warm entry, so hit each key a few times
+                    run_load(app.base_url, make_request, args.concurrency, 0, len(WARM_SET) * args.workers * 4)
+                fakes.reset()
+                samples, wall = run_load(app.base_url, make_request, args.concurrency, args.duration, args.requests)
+                results['scenarios'][name] = report(samples, wall, fakes.stats())
+            finally:
+                app.stop()
+            summary = results['scenarios'][name]
+            print(f"{name:12s} {summary['requests']:6d} req  {summary['throughput_rps']:8.1f} rps  "
+                  f"p50 {summary['latency_ms'].get('p50')} ms  p99 {summary['latency_ms'].get('p99')} ms  "
+                  f"errors {summary['errors']}  hit {summary['cache_hit_ratio']}")
+    finally:
+        fakes.stop()
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Measure Quickcify's cold start: from importing the app to its first responses.
+
+    python -m bench.startup                         # 10 runs of each mode
+    python -m bench.startup -n 20 -p /,/api/time -o startup.json
+    python -m bench.startup --modes import          # skip gunicorn
+
+Every run starts a fresh process, so nothing is warm except the OS page cache.
+
+- import: a new interpreter imports server and sends each path once through
+  Flask's test client. Reports the import time, each path's first-request
+  time, and import-to-first-response (import plus the first path).
+- gunicorn / gunicorn-nopreload: `gunicorn -c gunicorn.conf.py` with one
+  worker, with GUNICORN_PRELOAD on and off. Reports the time from spawning it
+  to the first 200 for the first path.
+
+No upstream is called: the default paths are served locally.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from bench.run import ROOT, App, _git_commit, summarize
+
+# runs in the child interpreter; argv[1:] are the paths to request
+_CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+client = server.app.test_client()
+first = {}
+for path in sys.argv[1:]:
+    t = time.perf_counter()
+    status = client.get(path).status_code
+    first[path] = {'status': status, 'ms': (time.perf_counter() - t) * 1000}
+    if len(first) == 1:
+        to_first = (time.perf_counter() - started) * 1000
+print(json.dumps({'import_ms': (imported - started) * 1000, 'import_to_first_response_ms': to_first, 'first': first}))
+'''
+
+MODES = ('import', 'gunicorn', 'gunicorn-nopreload')
+
+
+def run_import(env, paths):
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', _CHILD, *paths], cwd=ROOT, env={**os.environ, **env},
+                         capture_output=True, text=True, check=True).stdout
+    sample = json.loads(out.strip().splitlines()[-1])
+    sample['process_ms'] = (time.perf_counter() - started) * 1000
+    return sample
+
+
+def run_gunicorn(env, path, timeout=30):
+    started = time.perf_counter()
+    app = App(env, workers=1, threads=4)
+    try:
+        deadline = time.time() + timeout
+        with httpx.Client(timeout=1) as client:
+            while time.time() < deadline:
+                if app.proc.poll() is not None:
+                    raise RuntimeError('app exited during startup:\n' + app.proc.stderr.read().decode(errors='replace'))
+                try:
+                    if client.get(app.base_url + path).status_code == 200:
+                        return {'spawn_to_first_response_ms': (time.perf_counter() - started) * 1000}
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.005)
+        raise RuntimeError('app did not answer in time')
+    finally:
+        app.stop()
+
+
+def report(mode, samples, paths):
+    if mode == 'import':
+        return {
+            'import_ms': summarize([s['import_ms'] for s in samples]),
+            'import_to_first_response_ms': summarize([s['import_to_first_response_ms'] for s in samples]),
+            'process_ms': summarize([s['process_ms'] for s in samples]),
+            'first_request_ms': {p: summarize([s['first'][p]['ms'] for s in samples]) for p in paths},
+            'status': {p: sorted({s['first'][p]['status'] for s in samples}) for p in paths},
+        }
+    return {'spawn_to_first_response_ms': summarize([s['spawn_to_first_response_ms'] for s in samples])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--runs', type=int, default=10, help='fresh processes per mode')
+    parser.add_argument('-p', '--paths', default='/,/api/time,/healthz', help='comma separated, requested in order')
+    parser.add_argument('--modes', default=','.join(MODES), help='comma separated: ' + ', '.join(MODES))
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE', help='extra app environment')
+    parser.add_argument('-o', '--out', default='bench_startup.json')
+    args = parser.parse_args(argv)
+
+    paths = [p.strip() for p in args.paths.split(',') if p.strip()]
+    # a key is set so the OpenAI client is configured (but, being lazy, never built)
+    env = {'PREFETCH_ENABLED': '0', 'CHAT_CACHE_ENABLED': '0', 'OPENAI_API_KEY': 'sk-bench'}
+    env.update(item.split('=', 1) for item in args.env)
+
+    results = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': {'runs': args.runs, 'paths': paths, 'env': {k: v for k, v in env.items() if not k.endswith('_KEY')}},
+        'modes': {},
+    }
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        if mode == 'import':
+            samples = [run_import(env, paths) for _ in range(args.runs)]
+        else:
+            mode_env = {**env, 'GUNICORN_PRELOAD': '0' if mode == 'gunicorn-nopreload' else '1'}
+            samples = [run_gunicorn(mode_env, paths[0]) for _ in range(args.runs)]
+        summary = results['modes'][mode] = report(mode, samples, paths)
+        headline = summary.get('import_to_first_response_ms') or summary['spawn_to_first_response_ms']
+        print(f"{mode:20s} p50 {headline['p50']} ms  p95 {headline['p95']} ms  max {headline['max']} ms")
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Circuit breaker for third-party APIs.
+
+After `failure_threshold` consecutive failures the breaker opens and calls
+fail fast with CircuitOpen for `reset_timeout` seconds, instead of each one
+waiting out its own timeout. Then one trial call is let through (half-open).
+If it succeeds the breaker closes; if it fails the breaker opens again.
+"""
+import threading
+import time
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} circuit open')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go through now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpen(self.name, remaining)
+            if self._trial_running:
+                raise CircuitOpen(self.name, 1.0)
+            self.state = self.HALF_OPEN
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def is_open(self):
+        with self._lock:
+            return self.state != self.CLOSED
@@ -0,0 +1,304 @@
+"""Cache used by the real-time endpoints in server.py.
+
+Two backends are available:
+  - MemoryBackend: per-process LRU bounded by entry count (default)
+  - SQLiteBackend: a local file shared by every gunicorn worker on the host
+
+Cache.get_or_fetch() adds request coalescing (one in-flight fetch per key) and
+stale-while-revalidate on top of whichever backend is configured.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU of key -> (timestamp, data)."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.on_evict = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+            return item
+
+    def set(self, key, ts, data):
+        with self._lock:
+            self._data[key] = (ts, data)
+            self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.max_entries:
+                evicted.append(self._data.popitem(last=False)[0])
+        if self.on_evict is not None:
+            for old in evicted:
+                self.on_evict(old)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def try_lease(self, key, seconds):
+        # in-process coalescing is handled by Cache itself
+        return True
+
+    def release(self, key):
+        pass
+
+
+class SQLiteBackend:
+    """Key/value store in a local SQLite file (WAL mode) shared across processes.
+    Values must be JSON-serializable. Least recently used rows are pruned once
+    the table grows past max_entries. A read records its access time only if the
+    stored one is over touch_interval seconds old, so hits rarely take the write lock.
+    """
+
+    def __init__(self, path, max_entries=1024, touch_interval=60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.on_evict = None
+        self._local = threading.local()
+        self._pid = os.getpid()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, ts REAL NOT NULL, accessed REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads (or forked
+        # processes, e.g. gunicorn workers after preload), so keep one per thread
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT ts, accessed, data FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > self.touch_interval:
+            conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[0], json.loads(row[2])
+
+    def set(self, key, ts, data):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, ts, accessed, data) VALUES (?, ?, ?, ?)",
+                (key, ts, time.time(), json.dumps(data)),
+            )
+            evicted = conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?) RETURNING key",
+                (self.max_entries,),
+            ).fetchall()
+        if self.on_evict is not None:
+            for (old,) in evicted:
+                self.on_evict(old)
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def try_lease(self, key, seconds):
+        """Claim the right to fetch key across processes; False if another worker holds it."""
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            cur = conn.execute("INSERT OR IGNORE INTO leases (key, expires) VALUES (?, ?)", (key, now + seconds))
+        return cur.rowcount == 1
+
+    def release(self, key):
+        self._conn().execute("DELETE FROM leases WHERE key = ?", (key,))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Cache:
+    """TTL cache with single-flight fetches and stale-while-revalidate.
+
+    get(key, ttl) / set(key, data) behave like a plain TTL cache.
+    get_or_fetch(key, ttl, fetch) returns fresh data straight from the backend,
+    serves entries up to `stale_ttl` seconds past expiry while a background
+    refresh runs, and otherwise calls fetch() once no matter how many threads
+    ask for the same key at the same time. Exceptions raised by fetch() are
+    propagated to every waiter and nothing is cached, except that an exception
+    with a `negative_ttl` attribute (e.g. "unknown city") is remembered in this
+    process and re-raised without fetching for that many seconds.
+
+    get_entry() is the same but returns (ts, data), where ts is when the data
+    was fetched, so callers can derive validators such as Last-Modified.
+
+    last_known(key) returns the stored (ts, data) whatever its age, for callers
+    that prefer outdated data to an error.
+
+    on_event(event, key) is called for every 'hit', 'stale', 'miss',
+    'negative' (a remembered error) and 'eviction', e.g. to feed metrics.
+    """
+
+    max_negative_entries = 1024
+
+    def __init__(self, backend, lease_seconds=15, refresh_workers=4, on_event=None):
+        self.backend = backend
+        self.on_event = on_event
+        backend.on_evict = lambda key: self._emit('eviction', key)
+        self.lease_seconds = lease_seconds
+        self._flights = {}
+        self._negative = OrderedDict()  # key -> (expires, exception)
+        self._lock = threading.Lock()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='cache-refresh')
+
+    def _emit(self, event, key):
+        if self.on_event is not None:
+            self.on_event(event, key)
+
+    def get(self, key, ttl=300):
+        item = self.backend.get(key)
+        if item is None or time.time() - item[0] > ttl:
+            self._emit('miss', key)
+            return None
+        self._emit('hit', key)
+        return item[1]
+
+    def set(self, key, data):
+        ts = time.time()
+        self.backend.set(key, ts, data)
+        return ts
+
+    def last_known(self, key):
+        return self.backend.get(key)
+
+    def get_or_fetch(self, key, ttl, fetch, stale_ttl=None):
+        return self.get_entry(key, ttl, fetch, stale_ttl)[1]
+
+    def get_entry(self, key, ttl, fetch, stale_ttl=None):
+        if stale_ttl is None:
+            stale_ttl = ttl
+        item = self.backend.get(key)
+        seen_ts = 0
+        if item is not None:
+            seen_ts, data = item
+            age = time.time() - seen_ts
+            if age <= ttl:
+                self._emit('hit', key)
+                return item
+            if age <= ttl + stale_ttl:
+                self._emit('stale', key)
+                self._refresh_in_background(key, fetch, seen_ts)
+                return item
+        error = self._negative_hit(key)
+        if error is not None:
+            self._emit('negative', key)
+            raise error
+        self._emit('miss', key)
+        return self._fetch_once(key, fetch, seen_ts)
+
+    def _negative_hit(self, key):
+        with self._lock:
+            entry = self._negative.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._negative[key]
+                return None
+            return entry[1]
+
+    def _remember_error(self, key, error):
+        ttl = getattr(error, 'negative_ttl', None)
+        with self._lock:
+            if not ttl:
+                self._negative.pop(key, None)
+                return
+            self._negative[key] = (time.monotonic() + ttl, error)
+            self._negative.move_to_end(key)
+            while len(self._negative) > self.max_negative_entries:
+                self._negative.popitem(last=False)
+
+    def _refresh_in_background(self, key, fetch, seen_ts):
+        with self._lock:
+            if key in self._flights:
+                return
+            flight = self._flights[key] = _Flight()
+        self._refresh_pool.submit(self._run_flight, key, fetch, flight, seen_ts)
+
+    def _fetch_once(self, key, fetch, seen_ts):
+        with self._lock:
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._flights[key] = _Flight()
+        if owner:
+            self._run_flight(key, fetch, flight, seen_ts)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _run_flight(self, key, fetch, flight, seen_ts):
+        try:
+            leased = self.backend.try_lease(key, self.lease_seconds)
+            if not leased:
+                # another process is already fetching; wait briefly for its result
+                item = self._wait_for_peer(key, seen_ts)
+                if item is not None:
+                    flight.result = item
+                    return
+            try:
+                data = fetch()
+                flight.result = (self.set(key, data), data)
+            finally:
+                if leased:
+                    self.backend.release(key)
+        except Exception as e:
+            flight.error = e
+            self._remember_error(key, e)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _wait_for_peer(self, key, seen_ts):
+        deadline = time.time() + self.lease_seconds
+        while time.time() < deadline:
+            item = self.backend.get(key)
+            if item is not None and item[0] > seen_ts:
+                return item
+            time.sleep(0.05)
+        return None
+
+
+def cache_from_env(on_event=None):
+    """Build the cache described by CACHE_BACKEND (memory|sqlite), CACHE_PATH and CACHE_MAX_ENTRIES."""
+    max_entries = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+    if os.getenv('CACHE_BACKEND', 'memory').lower() == 'sqlite':
+        path = os.getenv('CACHE_PATH', 'quickcify_cache.sqlite3')
+        return Cache(SQLiteBackend(path, max_entries=max_entries), on_event=on_event)
+    return Cache(MemoryBackend(max_entries=max_entries), on_event=on_event)
@@ -0,0 +1,118 @@
+"""Server-side conversation store used by /chat.
+
+Conversations live in a local SQLite file (WAL mode) shared by every gunicorn
+worker on the host. The log is append-only: each user or assistant turn is one
+row in `messages`, keyed by conversation id. Rows are never updated.
+
+Turns are compacted when they are appended. The text sent to the model (the
+full content, or a truncated copy if it is oversized) and its token count are
+stored next to the original. Building a prompt is then a read of the newest
+rows until the token budget is spent, with no re-tokenizing of old turns.
+
+Conversations idle for longer than `ttl` seconds are deleted. Each process
+checks at most once every `prune_interval` seconds, when it appends.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def valid_id(conversation_id):
+    return isinstance(conversation_id, str) and bool(_ID_RE.match(conversation_id))
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+class ConversationStore:
+    def __init__(self, path, ttl=None, prune_interval=3600.0):
+        self.path = path
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+        self._local = threading.local()
+        self._pid = os.getpid()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, conversation TEXT NOT NULL, role TEXT NOT NULL, "
+                "content TEXT NOT NULL, context TEXT NOT NULL, tokens INTEGER NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation, seq)")
+
+    def _conn(self):
+        # one connection per thread, reopened after fork (see cache.SQLiteBackend)
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, conversation_id, turns):
+        """Append turns, a list of (role, content, context, tokens), in one transaction."""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO messages (conversation, role, content, context, tokens, created) VALUES (?, ?, ?, ?, ?, ?)",
+                [(conversation_id, role, content, context, tokens, now) for role, content, context, tokens in turns],
+            )
+        if self.ttl and now >= self._next_prune:
+            self._next_prune = now + self.prune_interval
+            self.prune(now - self.ttl)
+
+    def prune(self, before):
+        """Delete conversations whose newest turn is older than `before`. Returns rows deleted."""
+        conn = self._conn()
+        with conn:
+            return conn.execute(
+                "DELETE FROM messages WHERE conversation IN "
+                "(SELECT conversation FROM messages GROUP BY conversation HAVING MAX(created) < ?)",
+                (before,),
+            ).rowcount
+
+    def context(self, conversation_id, budget):
+        """Newest turns that fit in `budget` tokens, oldest first.
+        Returns (turns, omitted): turns are (role, context) pairs, and omitted is
+        how many older turns were left out.
+        """
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT role, context, tokens FROM messages WHERE conversation = ? ORDER BY seq DESC",
+            (conversation_id,),
+        )
+        turns = []
+        used = 0
+        for role, context, tokens in rows:
+            if used + tokens > budget:
+                total = conn.execute(
+                    "SELECT COUNT(*) FROM messages WHERE conversation = ?", (conversation_id,)
+                ).fetchone()[0]
+                turns.reverse()
+                return turns, total - len(turns)
+            used += tokens
+            turns.append((role, context))
+        turns.reverse()
+        return turns, 0
+
+    def messages(self, conversation_id, after=0, limit=200):
+        """Full turns with seq > after, for clients restoring a conversation."""
+        rows = self._conn().execute(
+            "SELECT seq, role, content, created FROM messages WHERE conversation = ? AND seq > ? "
+            "ORDER BY seq LIMIT ?",
+            (conversation_id, after, limit),
+        ).fetchall()
+        return [{'seq': seq, 'role': role, 'content': content, 'created': created}
+                for seq, role, content, created in rows]
@@ -0,0 +1,91 @@
+"""Production gunicorn settings for Quickcify.
+
+    gunicorn -c gunicorn.conf.py
+
+/chat calls spend most of their time waiting on OpenAI, so each worker runs
+many threads (gthread) rather than one request at a time. Set
+GUNICORN_WORKER_CLASS=gevent if gevent is installed. Everything can be
+overridden from the environment:
+
+    PORT / GUNICORN_BIND     listen address (default 0.0.0.0:$PORT, PORT=8000)
+    WEB_CONCURRENCY          worker processes (default 2 x CPUs, max 8)
+    GUNICORN_THREADS         threads per gthread worker (default 16)
+    GUNICORN_WORKER_CLASS    gthread | gevent | sync
+    GUNICORN_TIMEOUT         seconds before a silent worker is restarted (default 120)
+    GUNICORN_GRACEFUL_TIMEOUT  seconds to drain in-flight requests on SIGTERM (default 30)
+"""
+import multiprocessing
+import os
+import signal
+
+wsgi_app = "server:app"
+
+bind = os.getenv("GUNICORN_BIND") or f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(8, multiprocessing.cpu_count() * 2))))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))  # gevent only
+
+# long model generations and SSE streams must not be mistaken for hung workers
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# import server.py once in the master; when_ready() then builds the OpenAI
+# client, timezone index and static bundle before forking, so they are shared
+# copy-on-write. With GUNICORN_PRELOAD=0 each worker imports the app itself and
+# creates those lazily on first use, which is the faster cold start.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# Only one worker runs the background prefetcher (see server.py); the others
+# see what it fetched only through a shared cache, so several workers default
+# to the SQLite backend. With an explicit CACHE_BACKEND=memory prefetching is
+# turned off instead, as it would only warm one worker's cache.
+_prefetch_warning = None
+if workers > 1 and os.getenv("PREFETCH_ENABLED", "1") == "1":
+    os.environ.setdefault("CACHE_BACKEND", "sqlite")
+    if os.environ["CACHE_BACKEND"].lower() != "sqlite":
+        os.environ["PREFETCH_ENABLED"] = "0"
+        _prefetch_warning = (f"prefetching disabled: CACHE_BACKEND={os.environ['CACHE_BACKEND']} "
+                             f"is not shared by the {workers} workers; use CACHE_BACKEND=sqlite")
+
+# recycle workers occasionally to bound memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def when_ready(arbiter):
+    if _prefetch_warning:
+        arbiter.log.warning(_prefetch_warning)
+    if preload_app:
+        import server
+
+        server.warm_up()
+
+
+def post_fork(arbiter, worker):
+    if preload_app:
+        import server
+
+        # the app was imported in the master; restamp the start time for this worker
+        server.mark_process_start()
+
+
+def post_worker_init(worker):
+    """Flip /readyz to 503 as soon as this worker is asked to stop.
+    The original SIGTERM handler still runs, so gunicorn stops accepting new
+    connections and gives in-flight requests graceful_timeout to finish.
+    """
+    import server
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def on_sigterm(signum, frame):
+        server.mark_draining()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
@@ -0,0 +1,53 @@
+"""Response bodies shared by the /api cache (server.py) and the front-end
+bundle (static_bundle.py): the bytes, their validators and compressed variants.
+
+A variant is compressed on first use and kept, so a body is compressed at most
+once per coding. Brotli is offered when the brotli package is installed.
+"""
+import gzip
+import hashlib
+import threading
+
+from werkzeug.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# preferred first
+CODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+class Body:
+    """Bytes to send, with an ETag, Last-Modified and gzip/brotli variants.
+    best=True compresses harder, for bodies built once and served many times.
+    """
+
+    def __init__(self, raw, ts, content_type='application/json', best=False):
+        self.raw = raw
+        self.ts = ts
+        self.content_type = content_type
+        self.digest = hashlib.blake2b(raw, digest_size=12).hexdigest()
+        # weak, since the same entity may be sent gzip'd, brotli'd or plain
+        self.etag = f'W/"{self.digest}"'
+        self.last_modified = http_date(int(ts))
+        self._levels = {'br': 11, 'gzip': 9} if best else {'br': 5, 'gzip': 6}
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, coding):
+        with self._lock:
+            body = self._encoded.get(coding)
+            if body is None:
+                if coding == 'br':
+                    body = brotli.compress(self.raw, quality=self._levels['br'])
+                else:
+                    body = gzip.compress(self.raw, compresslevel=self._levels['gzip'])
+                self._encoded[coding] = body
+            return body
+
+    def precompress(self):
+        for coding in CODINGS:
+            self.encoded(coding)
+        return self
@@ -0,0 +1,71 @@
+"""Fast-path intents: chat messages the server can answer without the model.
+
+Like detect_tone() in server.py this is keyword matching, but each intent is a
+single compiled, anchored pattern over the whole (normalized) message, so only
+short unambiguous requests match. "what time is it in Tokyo?" matches;
+"what time is it in Tokyo and should I call my friend?" does not. classify()
+returns (intent, params) or None.
+"""
+import re
+
+# up to four words, so a place can't swallow the rest of a longer request
+_PLACE = r"(?P<place>[a-z][a-z_.,'/-]{0,30}(?:\s+[a-z_.,'/-]{1,30}){0,3}?)"
+_END = r"\s*[?.!]*$"
+_NOW = r"(?:\s+(?:right\s+)?now)?"
+
+_CLOCK = r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>am|pm|a\.m\.|p\.m\.)?"
+
+LEAGUES = {
+    'premier league': 'PL', 'epl': 'PL', 'pl': 'PL', 'english premier league': 'PL',
+    'la liga': 'PD', 'laliga': 'PD', 'serie a': 'SA', 'bundesliga': 'BL1', 'ligue 1': 'FL1',
+    'eredivisie': 'DED', 'champions league': 'CL', 'championship': 'ELC', 'primeira liga': 'PPL',
+}
+_LEAGUE = '(?P<league>' + '|'.join(sorted((re.escape(k) for k in LEAGUES), key=len, reverse=True)) + ')'
+
+# (intent, pattern), tried in order
+_PATTERNS = [
+    ('convert', re.compile(
+        r"^(?:convert\s+|what(?:'s|\s+is)\s+)?" + _CLOCK + r"\s+(?:in\s+)?(?P<src>[a-z][a-z .'/-]{0,40}?)"
+        r"(?:\s+time)?\s+(?:to|in)\s+(?P<dst>[a-z][a-z .'/-]{0,40}?)(?:\s+time)?" + _END)),
+    # a bare "time" or "what time?" is more likely a reply in a conversation than a question
+    ('time', re.compile(
+        r"^(?!(?:what\s+|the\s+)?time" + _END + r")(?:what(?:'s|\s+is|s)\s+the\s+|tell\s+me\s+the\s+|what\s+|the\s+)?(?:current\s+|local\s+)?time"
+        r"(?:\s+is\s+it)?" + _NOW + r"(?:\s+in\s+" + _PLACE + r")?" + _NOW + _END)),
+    ('date', re.compile(
+        r"^(?:what(?:'s|\s+is|s)\s+(?:the\s+)?(?:date|day)(?:\s+today)?|what\s+(?:date|day)\s+is\s+(?:it|today)(?:\s+today)?"
+        r"|today'?s\s+date|(?:the\s+)?date\s+today|what(?:'s|\s+is)\s+today)"
+        r"(?:\s+in\s+" + _PLACE + r")?" + _END)),
+    ('standings', re.compile(
+        r"^(?:show(?:\s+me)?\s+|what(?:'s|\s+is|\s+are)\s+|get\s+)?(?:the\s+)?(?:current\s+|latest\s+)?"
+        r"(?:" + _LEAGUE + r"\s+(?:league\s+)?(?:standings|table)"
+        r"|(?:standings|table)\s+(?:for|of|in)\s+(?:the\s+)?" + _LEAGUE.replace('league>', 'league2>') + r")" + _END)),
+]
+
+
+def normalize(text):
+    return ' '.join(text.lower().replace('’', "'").split())
+
+
+def classify(text):
+    if len(text) > 120:
+        return None
+    t = normalize(text)
+    for intent, pattern in _PATTERNS:
+        m = pattern.match(t)
+        if m is None:
+            continue
+        params = {k: v.strip(" ,.'") for k, v in m.groupdict().items() if v}
+        if intent == 'standings':
+            params = {'comp': LEAGUES[params.get('league') or params['league2']]}
+        elif intent == 'convert':
+            hour, minute = int(params['hour']), int(params.get('minute', 0))
+            ampm = params.get('ampm', '').replace('.', '')
+            if ampm == 'pm' and hour < 12:
+                hour += 12
+            elif ampm == 'am' and hour == 12:
+                hour = 0
+            if hour > 23 or minute > 59:
+                return None
+            params = {'hour': hour, 'minute': minute, 'src': params['src'], 'dst': params['dst']}
+        return intent, params
+    return None
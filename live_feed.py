@@ -0,0 +1,158 @@
+"""Push feed of live match scores.
+
+There is one poller thread per competition, however many clients subscribe.
+Each poll fetches the match list, diffs it against the previous snapshot and
+pushes only what changed to every subscriber:
+
+    snapshot  {"matches": [...]}                      sent first to each new subscriber
+    delta     {"changed": [...], "removed": [ids]}    new or updated matches
+    feed-error {"error": ...}                         a poll failed; the feed keeps going
+
+A poller stops once it has had no subscribers for a full interval.
+"""
+import logging
+import queue
+import threading
+
+log = logging.getLogger(__name__)
+
+
+def match_id(m):
+    return m.get('id') or f"{m.get('homeTeam')}|{m.get('awayTeam')}|{m.get('utcDate')}"
+
+
+def diff_matches(previous, current):
+    """Return (changed, removed_ids) between two {id: match} snapshots."""
+    changed = [m for mid, m in current.items() if previous.get(mid) != m]
+    removed = [mid for mid in previous if mid not in current]
+    return changed, removed
+
+
+class Subscription:
+    """Iterator of (event, payload) pairs; yields (None, None) as a heartbeat when idle."""
+
+    def __init__(self, feed, heartbeat, max_queue=50):
+        self.feed = feed
+        self.heartbeat = heartbeat
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def push(self, event, payload):
+        try:
+            self.queue.put_nowait((event, payload))
+        except queue.Full:
+            # slow client: drop its backlog and resync it with a fresh snapshot
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(('snapshot', self.feed.snapshot_payload()))
+
+    def __iter__(self):
+        while not self.closed:
+            try:
+                yield self.queue.get(timeout=self.heartbeat)
+            except queue.Empty:
+                yield None, None
+
+    def close(self):
+        self.closed = True
+        self.feed.unsubscribe(self)
+
+
+class LiveFeed:
+    def __init__(self, hub, comp):
+        self.hub = hub
+        self.comp = comp
+        self.snapshot = None  # {id: match} after the first successful poll
+        self.subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'live-feed-{comp or "all"}', daemon=True)
+
+    def snapshot_payload(self):
+        with self._lock:
+            return {'matches': list((self.snapshot or {}).values())}
+
+    def subscribe(self, sub):
+        with self._lock:
+            self.subscribers.add(sub)
+            ready = self.snapshot is not None
+        if ready:
+            sub.push('snapshot', self.snapshot_payload())
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self.subscribers.discard(sub)
+
+    def _broadcast(self, event, payload):
+        with self._lock:
+            subs = list(self.subscribers)
+        for sub in subs:
+            sub.push(event, payload)
+
+    def _run(self):
+        idle_passes = 0
+        while idle_passes < 2:
+            try:
+                data = self.hub.fetch(self.comp)
+            except Exception as e:
+                log.warning("live feed %s poll failed: %s", self.comp or 'all', e)
+                self._broadcast('feed-error', {'error': 'failed to fetch live matches'})
+            else:
+                current = {match_id(m): m for m in data.get('matches', [])}
+                with self._lock:
+                    previous = self.snapshot
+                    self.snapshot = current
+                if previous is None:
+                    self._broadcast('snapshot', {'matches': list(current.values())})
+                else:
+                    changed, removed = diff_matches(previous, current)
+                    if changed or removed:
+                        self._broadcast('delta', {'changed': changed, 'removed': removed})
+            self._wake.wait(self.hub.interval)
+            with self._lock:
+                idle_passes = 0 if self.subscribers else idle_passes + 1
+        self.hub._retire(self)
+
+
+class LiveFeedHub:
+    """Owns one LiveFeed per competition. fetch(comp) returns {'matches': [...]}."""
+
+    def __init__(self, fetch, interval=15.0, heartbeat=20.0, max_subscribers=200):
+        self.fetch = fetch
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(f.subscribers) for f in self._feeds.values())
+
+    def subscribe(self, comp):
+        """Return a Subscription, or None when max_subscribers is reached."""
+        if self.subscriber_count() >= self.max_subscribers:
+            return None
+        with self._lock:
+            feed = self._feeds.get(comp)
+            start = feed is None
+            if start:
+                feed = self._feeds[comp] = LiveFeed(self, comp)
+            sub = Subscription(feed, self.heartbeat)
+            feed.subscribe(sub)
+        if start:
+            feed._thread.start()
+        return sub
+
+    def _retire(self, feed):
+        with self._lock:
+            if self._feeds.get(feed.comp) is feed and not feed.subscribers:
+                del self._feeds[feed.comp]
+                return
+        if feed.subscribers:
+            # someone subscribed while we were shutting down; keep polling
+            feed._thread = threading.Thread(target=feed._run, name=feed._thread.name, daemon=True)
+            feed._thread.start()
@@ -0,0 +1,239 @@
+"""Scheduler around the OpenAI Responses API.
+
+- Bounded concurrency. Callers queue for a slot until their deadline, and a
+  few slots are kept free for heavy requests.
+- Per-model limits that track the x-ratelimit-* response headers. A request
+  waits for the window to reset instead of being sent only to come back 429.
+- Retries on 429, 5xx and connection errors with full-jitter exponential
+  backoff, honouring retry-after when the API sends it.
+"""
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+
+_DURATION_RE = re.compile(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?$")
+
+
+@lru_cache(maxsize=1)
+def _retryable():
+    # openai is only imported once a scheduler is actually making calls
+    import openai
+    return (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+
+
+class SchedulerBusy(Exception):
+    """No slot (or rate-limit capacity) became available before the deadline."""
+
+
+def parse_reset(value):
+    """Parse OpenAI reset durations such as '1s', '6m0s', '20ms' into seconds."""
+    if not value:
+        return None
+    m = _DURATION_RE.match(value.strip())
+    if not m or not any(m.groups()):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    h, mins, s, ms = (float(g) if g else 0.0 for g in m.groups())
+    return h * 3600 + mins * 60 + s + ms / 1000
+
+
+class ModelLimits:
+    """Request/token budget for one model, synced from response headers.
+    Between responses the remaining counts are decremented locally, so
+    concurrent callers see each other's usage.
+    """
+
+    def __init__(self):
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        if headers is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if headers.get('x-ratelimit-remaining-requests') is not None:
+                self.remaining_requests = int(headers['x-ratelimit-remaining-requests'])
+                self.requests_reset_at = now + (parse_reset(headers.get('x-ratelimit-reset-requests')) or 0)
+            if headers.get('x-ratelimit-remaining-tokens') is not None:
+                self.remaining_tokens = int(headers['x-ratelimit-remaining-tokens'])
+                self.tokens_reset_at = now + (parse_reset(headers.get('x-ratelimit-reset-tokens')) or 0)
+
+    def wait_time(self, est_tokens=0):
+        """Seconds until a request of est_tokens fits in the current window (0 if it fits now)."""
+        now = time.monotonic()
+        with self._lock:
+            wait = 0.0
+            if self.remaining_requests is not None and self.remaining_requests <= 0 and now < self.requests_reset_at:
+                wait = self.requests_reset_at - now
+            if self.remaining_tokens is not None and self.remaining_tokens < est_tokens and now < self.tokens_reset_at:
+                wait = max(wait, self.tokens_reset_at - now)
+            return wait
+
+    def reserve(self, est_tokens=0):
+        with self._lock:
+            if self.remaining_requests is not None:
+                self.remaining_requests -= 1
+            if self.remaining_tokens is not None:
+                self.remaining_tokens -= est_tokens
+
+
+class HeldStream:
+    """A streamed response that holds a scheduler slot.
+    The slot is released once: when the stream is exhausted, fails, is closed,
+    or is garbage collected without ever being iterated.
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._iter = iter(stream)
+        self._release = release
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iter)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        with self._lock:
+            release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            close = getattr(self._stream, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+class OpenAIScheduler:
+    """Runs client.responses.create calls through shared concurrency and rate limits.
+
+    max_concurrency slots are shared. Light requests (heavy=False) may only use
+    max_concurrency - reserved_heavy of them, so bursts of cheap chatter can't
+    starve heavier work. Every call has a deadline of queue_timeout seconds to
+    get a slot and rate-limit capacity. SchedulerBusy is raised if it can't.
+
+    observer(model, outcome, seconds) is called after every attempt, with
+    outcome 'ok' or the HTTP status / exception name, e.g. to feed metrics.
+    """
+
+    def __init__(self, client, max_concurrency=8, reserved_heavy=2, queue_timeout=20.0,
+                 max_retries=3, base_delay=0.5, max_delay=8.0, observer=None):
+        self.client = client
+        self.observer = observer
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._light_slots = threading.BoundedSemaphore(max(1, max_concurrency - reserved_heavy))
+        self._limits = {}
+        self._limits_lock = threading.Lock()
+
+    def limits(self, model):
+        with self._limits_lock:
+            lim = self._limits.get(model)
+            if lim is None:
+                lim = self._limits[model] = ModelLimits()
+            return lim
+
+    def saturated(self, model, est_tokens=0):
+        """True when the model's last known window has no room for this request."""
+        return self.limits(model).wait_time(est_tokens) > 0
+
+    def create(self, model, heavy=True, est_tokens=0, **kwargs):
+        deadline = time.monotonic() + self.queue_timeout
+        release = self._acquire(heavy, deadline)
+        try:
+            result = self._call(model, est_tokens, deadline, kwargs)
+        except BaseException:
+            release()
+            raise
+        if kwargs.get('stream'):
+            # keep the slot until the caller has drained or closed the stream
+            return HeldStream(result, release)
+        release()
+        return result
+
+    def _acquire(self, heavy, deadline):
+        if not heavy:
+            if not self._light_slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise SchedulerBusy("no capacity for light requests")
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            if not heavy:
+                self._light_slots.release()
+            raise SchedulerBusy("all OpenAI slots busy")
+
+        def release():
+            self._slots.release()
+            if not heavy:
+                self._light_slots.release()
+        return release
+
+    def _call(self, model, est_tokens, deadline, kwargs):
+        limits = self.limits(model)
+        attempt = 0
+        while True:
+            wait = limits.wait_time(est_tokens)
+            if wait:
+                if time.monotonic() + wait > deadline:
+                    raise SchedulerBusy(f"rate limit window for {model} resets after the deadline")
+                time.sleep(wait)
+            limits.reserve(est_tokens)
+            started = time.perf_counter()
+            try:
+                raw = self.client.responses.with_raw_response.create(model=model, **kwargs)
+                self._observe(model, 'ok', started)
+                limits.update(raw.headers)
+                return raw.parse()
+            except Exception as e:
+                self._observe(model, str(getattr(e, 'status_code', '') or type(e).__name__), started)
+                if not isinstance(e, _retryable()):
+                    raise
+                response = getattr(e, 'response', None)
+                headers = getattr(response, 'headers', None)
+                limits.update(headers)
+                attempt += 1
+                delay = self._backoff(attempt, headers)
+                if attempt > self.max_retries or time.monotonic() + delay > deadline:
+                    raise
+                time.sleep(delay)
+
+    def _observe(self, model, outcome, started):
+        if self.observer is not None:
+            self.observer(model, outcome, time.perf_counter() - started)
+
+    def _backoff(self, attempt, headers):
+        retry_after = None
+        if headers is not None:
+            if headers.get('retry-after-ms'):
+                retry_after = float(headers['retry-after-ms']) / 1000
+            else:
+                retry_after = parse_reset(headers.get('retry-after'))
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, cap)
+        return max(delay, retry_after or 0)
@@ -0,0 +1,163 @@
+"""Background prefetcher that keeps hot cache keys warm.
+
+A single daemon thread wakes up every `interval` seconds, and for every hot
+key whose cached value is older than `refresh_ratio` of its TTL, refetches it
+and writes it back to the cache. Each upstream has its own RateBudget, so the
+prefetcher only uses part of a provider's rate limit and leaves the rest for
+user-driven requests.
+
+Budgets are per process, so with several gunicorn workers only the one holding
+the LeaderLock runs passes; the others take over if it exits. A key whose
+fetch fails is backed off exponentially instead of being retried every pass.
+"""
+import logging
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not POSIX; every process prefetches
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+class RateBudget:
+    """Token bucket refilled continuously at `per_minute` tokens per minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self, n=1):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+            self.updated = now
+            if self.tokens < n:
+                return False
+            self.tokens -= n
+            return True
+
+
+class LeaderLock:
+    """Non-blocking exclusive flock on a shared file. The holding process keeps
+    it until it exits, when the OS releases it for the next worker to claim.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """True if this process holds the lock (claiming it if it is free)."""
+        if self._file is not None or fcntl is None:
+            return True
+        f = open(self.path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Prefetcher:
+    """Refresh hot cache keys ahead of their expiry.
+
+    resolve(key) returns (ttl, fetch, upstream, cost) for keys it knows about,
+    or None. `upstream` names an entry in `budgets`, and `cost` is the number of
+    upstream requests a single fetch makes. static_keys are always kept warm.
+    dynamic_keys() is called on every pass and can add keys such as the most
+    requested cities. With a `leader` lock, passes only run while it is held.
+    """
+
+    def __init__(self, cache, resolve, budgets, static_keys=(), dynamic_keys=None,
+                 interval=1.0, refresh_ratio=0.8, leader=None, max_backoff=300.0):
+        self.cache = cache
+        self.resolve = resolve
+        self.budgets = budgets
+        self.static_keys = list(static_keys)
+        self.dynamic_keys = dynamic_keys
+        self.interval = interval
+        self.refresh_ratio = refresh_ratio
+        self.leader = leader
+        self.max_backoff = max_backoff
+        self._failures = {}  # key -> (consecutive failures, monotonic time of next attempt)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def keys(self):
+        keys = list(self.static_keys)
+        if self.dynamic_keys is not None:
+            keys.extend(k for k in self.dynamic_keys() if k not in keys)
+        return keys
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='prefetch', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self.leader is not None:
+            self.leader.release()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.leader is None or self.leader.acquire():
+                    self.run_once()
+            except Exception:
+                log.exception("prefetch pass failed")
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        """Refresh every due key the budgets allow. Returns the refreshed keys."""
+        refreshed = []
+        now = time.monotonic()
+        for key in self.keys():
+            feed = self.resolve(key)
+            if feed is None:
+                continue
+            failure = self._failures.get(key)
+            if failure is not None and now < failure[1]:
+                continue
+            ttl, fetch, upstream, cost = feed
+            item = self.cache.backend.get(key)
+            if item is not None and time.time() - item[0] < ttl * self.refresh_ratio:
+                continue
+            budget = self.budgets.get(upstream)
+            if budget is not None and not budget.try_take(cost):
+                continue
+            # with a shared backend, only one worker refreshes a given key
+            if not self.cache.backend.try_lease(key, self.cache.lease_seconds):
+                continue
+            try:
+                self.cache.set(key, fetch())
+                refreshed.append(key)
+                self._failures.pop(key, None)
+            except Exception as e:
+                count = (failure[0] if failure else 0) + 1
+                # 5s, 10s, 20s, ... up to max_backoff; longer if the error says how long it will persist
+                delay = min(self.max_backoff, 5.0 * 2 ** (count - 1))
+                delay = max(delay, getattr(e, 'negative_ttl', None) or 0)
+                self._failures[key] = (count, time.monotonic() + delay)
+                log.warning("prefetch of %s failed (%d in a row, next try in %.0fs): %s", key, count, delay, e)
+            finally:
+                self.cache.backend.release(key)
+        for key in set(self._failures) - set(self.keys()):
+            del self._failures[key]
+        return refreshed
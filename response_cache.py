@@ -0,0 +1,117 @@
+"""Opt-in cache of /chat replies for repeated questions.
+
+Entries are keyed by (tone, model, normalized message). Lookups try an exact
+match first. If a similarity threshold is configured and NumPy is installed,
+they then fall back to a brute-force cosine search over hashed character
+trigram vectors of the cached messages. Matching is scoped to the same tone
+and model. Vectors are computed locally, so a lookup never calls an API.
+"""
+import importlib.util
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
+# similarity tier is simply unavailable without NumPy; it's imported on first use
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+_PUNCT = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r"\s+")
+VECTOR_DIMS = 1024
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return _SPACES.sub(' ', _PUNCT.sub(' ', text.lower())).strip()
+
+
+@lru_cache(maxsize=1)
+def _np():
+    import numpy
+    return numpy
+
+
+def _vectorize(norm):
+    np = _np()
+    vec = np.zeros(VECTOR_DIMS, dtype=np.float32)
+    padded = f"  {norm}  "
+    for i in range(len(padded) - 2):
+        vec[zlib.crc32(padded[i:i + 3].encode()) % VECTOR_DIMS] += 1.0
+    length = np.linalg.norm(vec)
+    return vec / length if length else vec
+
+
+class ResponseCache:
+    """Bounded LRU of chat replies with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries=512, ttl=3600, similarity_threshold=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold if HAS_NUMPY else None
+        self._entries = OrderedDict()  # key -> (expires, scope, vector, value)
+        self._matrix = None  # stacked vectors, rebuilt lazily after changes
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        self.stats = {'hits_exact': 0, 'hits_similar': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+    @staticmethod
+    def _key(message, tone, model):
+        scope = f"{tone}|{model}"
+        return f"{scope}|{normalize(message)}", scope
+
+    def get(self, message, tone, model):
+        """Return the cached value for a message, or None."""
+        key, scope = self._key(message, tone, model)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats['hits_exact'] += 1
+                    return entry[3]
+                self._remove(key)
+                self.stats['expired'] += 1
+            if self.similarity_threshold is not None and self._entries:
+                value = self._similar(key[len(scope) + 1:], scope, now)
+                if value is not None:
+                    self.stats['hits_similar'] += 1
+                    return value
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, message, tone, model, value, ttl=None):
+        key, scope = self._key(message, tone, model)
+        vector = _vectorize(key[len(scope) + 1:]) if self.similarity_threshold is not None else None
+        with self._lock:
+            self._entries[key] = (time.time() + (ttl or self.ttl), scope, vector, value)
+            self._entries.move_to_end(key)
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    def _similar(self, norm, scope, now):
+        np = _np()
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([self._entries[k][2] for k in self._matrix_keys])
+        scores = self._matrix @ _vectorize(norm)
+        for idx in np.argsort(scores)[::-1][:5]:
+            if scores[idx] < self.similarity_threshold:
+                break
+            key = self._matrix_keys[idx]
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != scope:
+                continue
+            if entry[0] <= now:
+                continue
+            self._entries.move_to_end(key)
+            return entry[3]
+        return None
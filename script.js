@@ -1,4 +1,6 @@
 ﻿let currentChat = [];
+// server-side conversation id; the server keeps the history, so /chat only needs the new message
+let conversationId = null;
 
 function displayMessage(text, type, skipSave = false) {
     let messages = document.getElementById("messages");
@@ -18,7 +20,7 @@ function newChat() {
             let title = new Date().toLocaleString();
             const firstUser = currentChat.find(m => m.type === 'user');
             if (firstUser) title = firstUser.content.substring(0, 60);
-            saved.unshift({ id: Date.now(), title: title, createdAt: Date.now(), messages: currentChat });
+            saved.unshift({ id: Date.now(), title: title, createdAt: Date.now(), messages: currentChat, conversationId });
             if (saved.length > 20) saved = saved.slice(0, 20);
             localStorage.setItem('quickcify_chats', JSON.stringify(saved));
             renderSavedChats();
@@ -26,8 +28,10 @@ function newChat() {
     } catch (e) {
         console.error('Failed to save chat', e);
     }
+    closeLiveScores();
     document.getElementById("messages").innerHTML = "";
     currentChat = [];
+    conversationId = null;
     // set placeholder to default and send greeting as first bot message
     const inp = document.getElementById('userInput');
     if (inp) {
@@ -40,8 +44,10 @@ function newChat() {
 }
 
 function clearChat() {
+    closeLiveScores();
     document.getElementById("messages").innerHTML = "";
     currentChat = [];
+    conversationId = null;
     const inp = document.getElementById('userInput');
     if (inp) inp.placeholder = 'Type your message...';
     const auto = (localStorage.getItem('quickcify_auto_send_greeting') !== 'false');
@@ -143,50 +149,32 @@ async function sendMessage() {
         input.value = "";
         return;
     }
-    // local shortcut: answer date/time queries using server /api/time
-    const timeRegex = /\b(what(?:'s|\s+is)? the time|what time is it|current time|date and time|what(?:'s|\s+is)? the date|today(?:'s)? date|current date|time now)\b/i;
-    if (timeRegex.test(message)) {
-        const thinkingTime = createThinkingElem();
-        try {
-            const res = await fetch('/api/time');
-            const data = await parseJSONorThrow(res);
-            removeElem(thinkingTime);
-            if (data.server_date && data.server_time) {
-                const tzName = data.server_timezone || '';
-                const offset = data.server_utc_offset ? `UTC${data.server_utc_offset}` : '';
-                let tzPart = '';
-                if (tzName && offset) tzPart = `${tzName} (${offset})`;
-                else if (offset) tzPart = offset;
-
-                const dateText = `Today's date is ${data.server_date}.`;
-                const timeText = `The current time is ${data.server_time}${tzPart ? ' — ' + tzPart : ''}.`;
-                displayMessage(`${dateText} ${timeText}`, 'bot');
-            } else if (data.server_local) {
-                displayMessage(`Current server time: ${data.server_local}`, 'bot');
-            } else {
-                displayMessage('Could not retrieve server time.', 'bot');
-            }
-        } catch (err) {
-            removeElem(thinkingTime);
-            console.error(err);
-            displayMessage('Error: Could not fetch time from server.', 'bot');
-        }
-        input.value = '';
-        return;
-    }
     input.value = "";
 
-    let model = document.getElementById("modelSelect").value;
+    // "Auto" leaves the model to the server, which routes short messages to a lighter one
+    let model = document.getElementById("modelSelect").value || undefined;
+    // "what time is it?" is answered in the user's own zone
+    const timezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
     const thinking = createThinkingElem();
 
     try {
-        // include recent conversation history so the model has context
-        const historyToSend = currentChat.slice(-20); // last 20 entries
-        let response = await fetch(`/chat`, {
+        // a chat without an id asks for one; chats saved before the server kept
+        // history send theirs once to seed it (and every time if the store is off)
+        const body = conversationId ? { message, model, timezone, conversation_id: conversationId }
+            : currentChat.some(m => m.type === 'user' && m.content !== message) ? { message, model, timezone, conversation_id: 'new', history: currentChat.slice(-20) }
+            : { message, model, timezone, conversation_id: 'new' };
+        let response = await fetch(`/chat?stream=1`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ message, model, history: historyToSend })
+            body: JSON.stringify(body)
         });
+        conversationId = response.headers.get('X-Conversation-Id') || conversationId;
+
+        const ctype = response.headers.get('content-type') || '';
+        if (response.ok && ctype.includes('text/event-stream') && response.body) {
+            await renderStreamedReply(response, thinking);
+            return;
+        }
 
         let data = await parseJSONorThrow(response);
         removeElem(thinking);
@@ -198,12 +186,64 @@ async function sendMessage() {
     }
 }
 
+// Read a text/event-stream /chat response and render deltas into one bot message as they arrive.
+// Frames look like: "event: delta\ndata: {...}\n\n"; the final "done" frame carries model_used/usage.
+async function renderStreamedReply(response, thinking) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let div = null;
+    const messages = document.getElementById("messages");
+
+    const handleFrame = (frame) => {
+        let event = 'message';
+        let dataLines = [];
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+        });
+        if (!dataLines.length) return;
+        const payload = JSON.parse(dataLines.join('\n'));
+        if (event === 'delta') {
+            if (!div) {
+                removeElem(thinking);
+                div = document.createElement("div");
+                div.className = "message bot";
+                messages.appendChild(div);
+            }
+            text += payload.text || '';
+            div.innerText = text;
+            messages.scrollTop = messages.scrollHeight;
+        } else if (event === 'error') {
+            throw new Error(payload.details || payload.error || 'stream error');
+        }
+    };
+
+    try {
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let idx;
+            while ((idx = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, idx);
+                buffer = buffer.slice(idx + 2);
+                handleFrame(frame);
+            }
+        }
+    } finally {
+        removeElem(thinking);
+        if (div) currentChat.push({ type: 'bot', content: text, html: false, ts: Date.now() });
+    }
+}
+
 async function fetchLeague(comp, name) {
     displayMessage(`Requesting ${name}...`, "user");
     const thinking = createThinkingElem();
 
     try {
-        let res = await fetch(`/api/league?comp=${comp}`);
+        let res = await fetch(`/api/league?comp=${comp}&limit=3`);
         let data = await parseJSONorThrow(res);
         removeElem(thinking);
 
@@ -245,10 +285,98 @@ async function fetchLeague(comp, name) {
     }
 }
 
+function liveMatchHTML(m) {
+    let when;
+    try { when = new Date(m.utcDate).toLocaleString(); } catch (e) { when = m.utcDate || '' }
+    const home = (m.score && m.score.fullTime && (m.score.fullTime.homeTeam != null)) ? m.score.fullTime.homeTeam : (m.score && m.score.homeTeam) || '';
+    const away = (m.score && m.score.fullTime && (m.score.fullTime.awayTeam != null)) ? m.score.fullTime.awayTeam : (m.score && m.score.awayTeam) || '';
+    const scoreStr = (home !== '' || away !== '') ? `${home} - ${away}` : '';
+    return `<strong>${escapeHtml(m.homeTeam || '')}</strong> ${escapeHtml(scoreStr)} <strong>${escapeHtml(m.awayTeam || '')}</strong><div class="muted">${escapeHtml(m.competition || '')} • ${escapeHtml(m.status || '')} • ${escapeHtml(when)}</div>`;
+}
+
+function liveMatchId(m) {
+    return String(m.id || `${m.homeTeam}|${m.awayTeam}|${m.utcDate}`);
+}
+
+// Only one live score subscription is open at a time. Each open stream holds a
+// server thread, so it is closed as soon as its chat is cleared or replaced.
+let liveSource = null;
+
+function closeLiveScores() {
+    if (liveSource) liveSource.close();
+    liveSource = null;
+}
+
 async function fetchLiveScores(comp) {
     const label = comp ? (comp === 'PL' ? 'Live EPL' : (comp === 'PD' ? 'Live LaLiga' : `Live ${comp}`)) : 'Live Matches';
     displayMessage(`Requesting ${label}...`, "user");
     const thinking = createThinkingElem();
+    if (window.EventSource) subscribeLiveScores(comp, label, thinking);
+    else await fetchLiveScoresOnce(comp, label, thinking);
+}
+
+// Subscribe to /api/live-scores/stream: render the snapshot once, then patch
+// individual matches in place as 'delta' events arrive.
+function subscribeLiveScores(comp, label, thinking) {
+    closeLiveScores();
+    const source = new EventSource(comp ? `/api/live-scores/stream?comp=${comp}` : `/api/live-scores/stream`);
+    liveSource = source;
+    let div = null, header = null, list = null;
+
+    const upsert = (m) => {
+        const id = liveMatchId(m);
+        let li = Array.from(list.children).find(el => el.dataset.id === id);
+        if (!li) {
+            li = document.createElement('li');
+            li.dataset.id = id;
+            list.appendChild(li);
+        }
+        li.innerHTML = liveMatchHTML(m);
+    };
+    const updateHeader = () => {
+        header.textContent = list.children.length ? `${label} — ${list.children.length} match(es) live` : 'No live matches right now.';
+    };
+    const fallback = () => {
+        source.close();
+        if (liveSource === source) liveSource = null;
+        fetchLiveScoresOnce(comp, label, thinking);
+    };
+
+    source.addEventListener('snapshot', (e) => {
+        const data = JSON.parse(e.data);
+        const first = !div;
+        if (first) {
+            removeElem(thinking);
+            const messages = document.getElementById("messages");
+            div = document.createElement("div");
+            div.className = "message bot";
+            header = document.createElement("strong");
+            list = document.createElement("ul");
+            div.appendChild(header);
+            div.appendChild(list);
+            messages.appendChild(div);
+            messages.scrollTop = messages.scrollHeight;
+        }
+        list.innerHTML = '';
+        (data.matches || []).forEach(upsert);
+        updateHeader();
+        if (first) currentChat.push({ type: 'bot', content: div.innerHTML, html: true, ts: Date.now() });
+    });
+    source.addEventListener('delta', (e) => {
+        if (!list) return;
+        const data = JSON.parse(e.data);
+        (data.changed || []).forEach(upsert);
+        (data.removed || []).forEach(id => {
+            removeElem(Array.from(list.children).find(el => el.dataset.id === String(id)));
+        });
+        updateHeader();
+    });
+    source.addEventListener('feed-error', () => { if (!div) fallback(); });
+    // before the first snapshot, fall back to a one-off fetch; afterwards EventSource reconnects by itself
+    source.onerror = () => { if (!div) fallback(); };
+}
+
+async function fetchLiveScoresOnce(comp, label, thinking) {
     try {
         const url = comp ? `/api/live-scores?comp=${comp}` : `/api/live-scores`;
         let res = await fetch(url);
@@ -268,12 +396,7 @@ async function fetchLiveScores(comp) {
 
         let html = `<strong>${label} — ${matches.length} match(es) live</strong><ul>`;
         matches.forEach(m => {
-            let when;
-            try { when = new Date(m.utcDate).toLocaleString(); } catch (e) { when = m.utcDate || '' }
-            const home = (m.score && m.score.fullTime && (m.score.fullTime.homeTeam != null)) ? m.score.fullTime.homeTeam : (m.score && m.score.homeTeam) || '';
-            const away = (m.score && m.score.fullTime && (m.score.fullTime.awayTeam != null)) ? m.score.fullTime.awayTeam : (m.score && m.score.awayTeam) || '';
-            const scoreStr = (home !== '' || away !== '') ? `${home} - ${away}` : '';
-            html += `<li><strong>${escapeHtml(m.homeTeam || '')}</strong> ${escapeHtml(scoreStr)} <strong>${escapeHtml(m.awayTeam || '')}</strong><div class="muted">${escapeHtml(m.competition || '')} • ${escapeHtml(m.status || '')} • ${escapeHtml(when)}</div></li>`;
+            html += `<li>${liveMatchHTML(m)}</li>`;
         });
         html += '</ul>';
 
@@ -314,9 +437,11 @@ function restoreChat(id) {
     let saved = JSON.parse(localStorage.getItem('quickcify_chats') || '[]');
     const chat = saved.find(c => c.id === id);
     if (!chat) return;
+    closeLiveScores();
     const messagesElem = document.getElementById('messages');
     messagesElem.innerHTML = '';
     currentChat = [];
+    conversationId = chat.conversationId || null;
     chat.messages.forEach(m => {
         if (m.html) displayHTMLMessage(m.content, m.type, true);
         else displayMessage(m.content, m.type, true);
@@ -0,0 +1,79 @@
+"""The front end (index.html, style.css, script.js) served from memory.
+
+The files are read once, on first use. style.css and script.js are also
+published under a content-hashed name (style.<hash>.css), and index.html is
+rewritten to reference those names. Browsers can therefore cache them for a
+year as immutable, and a deploy changes the URLs. index.html itself stays
+revalidated by ETag. Every asset is gzip'd, and brotli'd if brotli is
+installed, once when the bundle is built rather than on each request.
+"""
+import os
+import re
+import threading
+
+from http_body import Body
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+}
+
+
+class Asset(Body):
+    """One file, compressed in every coding as soon as it is built."""
+
+    def __init__(self, name, raw, mtime):
+        super().__init__(raw, mtime, CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream'),
+                         best=True)
+        self.name = name
+        self.precompress()
+
+
+class StaticBundle:
+    def __init__(self, root, page='index.html', assets=('style.css', 'script.js')):
+        self.root = root
+        self.page = page
+        self.asset_names = assets
+        self._files = None  # url name -> (Asset, immutable)
+        self._mtimes = None
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        return {name: os.stat(os.path.join(self.root, name)).st_mtime for name in (self.page, *self.asset_names)}
+
+    def _read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as f:
+            return f.read()
+
+    def _build(self, mtimes):
+        files = {}
+        page = self._read(self.page)
+        for name in self.asset_names:
+            asset = Asset(name, self._read(name), mtimes[name])
+            stem, ext = os.path.splitext(name)
+            hashed = f'{stem}.{asset.digest[:10]}{ext}'
+            # the plain name keeps working for pages cached before a deploy
+            files[name] = (asset, False)
+            files[hashed] = (asset, True)
+            pattern = re.compile(rb'((?:href|src)=")/?' + re.escape(name.encode()) + b'"')
+            page = pattern.sub(rb'\g<1>/' + hashed.encode() + b'"', page)
+        files[self.page] = (Asset(self.page, page, mtimes[self.page]), False)
+        return files
+
+    def files(self, reload=False):
+        """Map of URL name -> (Asset, immutable), built on first call.
+        With reload=True (debug mode) it is rebuilt whenever a file changes.
+        """
+        if self._files is not None and not reload:
+            return self._files
+        with self._lock:
+            if self._files is None or reload:
+                mtimes = self._stat()
+                if mtimes != self._mtimes:
+                    self._files = self._build(mtimes)
+                    self._mtimes = mtimes
+            return self._files
+
+    def get(self, name, reload=False):
+        return self.files(reload).get(name, (None, False))
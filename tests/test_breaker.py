@@ -0,0 +1,72 @@
+import pytest
+
+import breaker
+from breaker import CircuitBreaker, CircuitOpen
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def trip(b):
+    for _ in range(b.failure_threshold):
+        b.before_call()
+        b.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    b = CircuitBreaker('x', failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        b.before_call()
+        b.record_failure()
+    assert not b.is_open()
+    b.before_call()
+    b.record_failure()
+    assert b.is_open()
+    with pytest.raises(CircuitOpen) as exc:
+        b.before_call()
+    assert exc.value.retry_after == pytest.approx(30)
+
+
+def test_success_resets_failure_count(clock):
+    b = CircuitBreaker('x', failure_threshold=3)
+    for _ in range(2):
+        b.record_failure()
+    b.record_success()
+    b.record_failure()
+    assert not b.is_open()
+
+
+def test_half_open_allows_one_trial(clock):
+    b = CircuitBreaker('x', failure_threshold=2, reset_timeout=30)
+    trip(b)
+    clock[0] += 31
+    b.before_call()
+    assert b.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        b.before_call()
+
+
+def test_half_open_success_closes(clock):
+    b = CircuitBreaker('x', failure_threshold=2, reset_timeout=30)
+    trip(b)
+    clock[0] += 31
+    b.before_call()
+    b.record_success()
+    assert b.state == CircuitBreaker.CLOSED
+    b.before_call()
+
+
+def test_half_open_failure_reopens(clock):
+    b = CircuitBreaker('x', failure_threshold=5, reset_timeout=30)
+    trip(b)
+    clock[0] += 31
+    b.before_call()
+    b.record_failure()
+    assert b.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen) as exc:
+        b.before_call()
+    assert exc.value.retry_after == pytest.approx(30)
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from cache import Cache, MemoryBackend, SQLiteBackend
+
+
+class NotFound(Exception):
+    negative_ttl = 60
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'sqlite':
+        return Cache(SQLiteBackend(str(tmp_path / 'cache.sqlite3')))
+    return Cache(MemoryBackend())
+
+
+def test_get_or_fetch_caches_until_ttl(cache):
+    calls = []
+    fetch = lambda: calls.append(1) or {'n': len(calls)}
+    assert cache.get_or_fetch('k', 60, fetch) == {'n': 1}
+    assert cache.get_or_fetch('k', 60, fetch) == {'n': 1}
+    assert len(calls) == 1
+
+
+def test_single_flight(cache):
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'v': 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch('k', 60, fetch))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == [1]
+    assert results == [{'v': 1}] * 8
+
+
+def test_stale_entry_is_served_while_refreshing(cache):
+    cache.backend.set('k', time.time() - 90, {'v': 'old'})
+    refreshed = threading.Event()
+
+    def fetch():
+        refreshed.set()
+        return {'v': 'new'}
+
+    assert cache.get_or_fetch('k', 60, fetch) == {'v': 'old'}
+    assert refreshed.wait(5)
+    deadline = time.time() + 5
+    while cache.backend.get('k')[1] != {'v': 'new'} and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get_or_fetch('k', 60, fetch) == {'v': 'new'}
+
+
+def test_errors_are_not_cached(cache):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        raise RuntimeError('down')
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            cache.get_or_fetch('k', 60, fetch)
+    assert len(calls) == 2
+    assert cache.last_known('k') is None
+
+
+def test_negative_entries_are_remembered(cache):
+    events = []
+    cache.on_event = lambda event, key: events.append(event)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        raise NotFound('unknown city')
+
+    for _ in range(3):
+        with pytest.raises(NotFound):
+            cache.get_or_fetch('weather:nowhere', 60, fetch)
+    assert len(calls) == 1
+    assert events.count('negative') == 2
+
+
+def test_negative_entries_expire(cache):
+    def fetch():
+        error = NotFound('unknown city')
+        error.negative_ttl = 0.05
+        raise error
+
+    with pytest.raises(NotFound):
+        cache.get_or_fetch('k', 60, fetch)
+    time.sleep(0.1)
+    assert cache.get_or_fetch('k', 60, lambda: {'v': 1}) == {'v': 1}
+
+
+def test_last_known_ignores_age(cache):
+    cache.backend.set('k', time.time() - 10_000, {'v': 1})
+    assert cache.get('k', 60) is None
+    assert cache.last_known('k')[1] == {'v': 1}
+
+
+def test_memory_backend_evicts_least_recently_used():
+    evicted = []
+    backend = MemoryBackend(max_entries=2)
+    cache = Cache(backend, on_event=lambda event, key: event == 'eviction' and evicted.append(key))
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert evicted == ['b']
+    assert backend.get('b') is None
+
+
+def test_sqlite_hit_does_not_write(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'cache.sqlite3'), touch_interval=60)
+    backend.set('k', time.time(), {'v': 1})
+    statements = []
+    backend._conn().set_trace_callback(statements.append)
+    for _ in range(10):
+        assert backend.get('k')[1] == {'v': 1}
+    assert not [s for s in statements if s.startswith('UPDATE')]
+
+
+def test_sqlite_lease_is_exclusive(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    a, b = SQLiteBackend(path), SQLiteBackend(path)
+    assert a.try_lease('k', 10)
+    assert not b.try_lease('k', 10)
+    a.release('k')
+    assert b.try_lease('k', 10)
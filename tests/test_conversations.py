@@ -0,0 +1,61 @@
+import pytest
+
+from conversations import ConversationStore, new_id, valid_id
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConversationStore(str(tmp_path / 'conversations.sqlite3'))
+
+
+def _turn(role, text, tokens):
+    return (role, text, text, tokens)
+
+
+def test_ids():
+    assert valid_id(new_id())
+    assert not valid_id('short')
+    assert not valid_id('../../etc/passwd')
+    assert not valid_id(None)
+
+
+def test_context_returns_everything_within_budget(store):
+    store.append('c1', [_turn('user', 'hi', 2), _turn('assistant', 'hello', 3)])
+    assert store.context('c1', budget=10) == ([('user', 'hi'), ('assistant', 'hello')], 0)
+
+
+def test_context_keeps_newest_turns_and_counts_omitted(store):
+    store.append('c1', [_turn('user', 'one', 4), _turn('assistant', 'two', 4)])
+    store.append('c1', [_turn('user', 'three', 4), _turn('assistant', 'four', 4)])
+    turns, omitted = store.context('c1', budget=9)
+    assert turns == [('user', 'three'), ('assistant', 'four')]
+    assert omitted == 2
+
+
+def test_context_stops_at_first_turn_over_budget(store):
+    # an older short turn is not packed past a long one, which would reorder the history
+    store.append('c1', [_turn('user', 'short', 1), _turn('assistant', 'long', 50), _turn('user', 'last', 1)])
+    assert store.context('c1', budget=10) == ([('user', 'last')], 2)
+
+
+def test_conversations_are_separate(store):
+    store.append('c1', [_turn('user', 'mine', 1)])
+    store.append('c2', [_turn('user', 'yours', 1)])
+    assert store.context('c2', budget=10) == ([('user', 'yours')], 0)
+    assert [m['content'] for m in store.messages('c1')] == ['mine']
+
+
+def test_messages_after(store):
+    store.append('c1', [_turn('user', 'a', 1), _turn('assistant', 'b', 1), _turn('user', 'c', 1)])
+    first = store.messages('c1', limit=2)
+    assert [m['content'] for m in first] == ['a', 'b']
+    assert [m['content'] for m in store.messages('c1', after=first[-1]['seq'])] == ['c']
+
+
+def test_prune_drops_idle_conversations(store):
+    store.append('old', [_turn('user', 'a', 1)])
+    store._conn().execute("UPDATE messages SET created = 0")
+    store.append('new', [_turn('user', 'b', 1)])
+    assert store.prune(before=100) == 1
+    assert store.messages('old') == []
+    assert len(store.messages('new')) == 1
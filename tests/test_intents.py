@@ -0,0 +1,46 @@
+import pytest
+
+from intents import classify
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('What time is it?', ('time', {})),
+    ("what's the time", ('time', {})),
+    ('current time', ('time', {})),
+    ('time now', ('time', {})),
+    ('what time is it in Tokyo?', ('time', {'place': 'tokyo'})),
+    ('What is the time in New York right now', ('time', {'place': 'new york'})),
+    ('time in tokyo', ('time', {'place': 'tokyo'})),
+    ('time in bosnia and herzegovina', ('time', {'place': 'bosnia and herzegovina'})),
+    ('time in America/New_York', ('time', {'place': 'america/new_york'})),
+    ("what's the date", ('date', {})),
+    ('what day is it today?', ('date', {})),
+    ("today's date in Lagos", ('date', {'place': 'lagos'})),
+    ('convert 3pm London to Tokyo', ('convert', {'hour': 15, 'minute': 0, 'src': 'london', 'dst': 'tokyo'})),
+    ('what is 9:30 am in new york in paris?', ('convert', {'hour': 9, 'minute': 30, 'src': 'new york', 'dst': 'paris'})),
+    ('12am utc to lagos', ('convert', {'hour': 0, 'minute': 0, 'src': 'utc', 'dst': 'lagos'})),
+    ('show me the premier league table', ('standings', {'comp': 'PL'})),
+    ('La Liga standings', ('standings', {'comp': 'PD'})),
+    ('standings for the bundesliga?', ('standings', {'comp': 'BL1'})),
+])
+def test_matches(text, expected):
+    assert classify(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    # bare replies mid-conversation
+    'time',
+    'the time',
+    'time?',
+    'what time?',
+    'money or time?',
+    'today',
+    'what is time',
+    # longer requests go to the model
+    'what time is it in Tokyo and should I call my friend?',
+    'how do I show the premier league table on my website',
+    'convert 25:00 london to paris',
+    'x' * 121,
+])
+def test_no_match(text):
+    assert classify(text) is None
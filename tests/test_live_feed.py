@@ -0,0 +1,25 @@
+from live_feed import diff_matches
+
+
+def test_no_changes():
+    snapshot = {1: {'id': 1, 'score': '0-0'}}
+    assert diff_matches(snapshot, dict(snapshot)) == ([], [])
+
+
+def test_changed_and_new_matches_are_deltas():
+    previous = {1: {'id': 1, 'score': '0-0'}, 2: {'id': 2, 'score': '1-1'}}
+    current = {1: {'id': 1, 'score': '1-0'}, 2: {'id': 2, 'score': '1-1'}, 3: {'id': 3, 'score': '0-0'}}
+    changed, removed = diff_matches(previous, current)
+    assert changed == [current[1], current[3]]
+    assert removed == []
+
+
+def test_finished_matches_are_removed():
+    previous = {1: {'id': 1, 'score': '2-0'}, 2: {'id': 2, 'score': '1-1'}}
+    current = {2: {'id': 2, 'score': '1-1'}}
+    assert diff_matches(previous, current) == ([], [1])
+
+
+def test_first_snapshot_is_all_changes():
+    current = {1: {'id': 1}, 2: {'id': 2}}
+    assert diff_matches({}, current) == ([current[1], current[2]], [])
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from openai_scheduler import HeldStream, ModelLimits, OpenAIScheduler, SchedulerBusy, parse_reset
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ('1s', 1.0),
+    ('6m0s', 360.0),
+    ('20ms', 0.02),
+    ('1h2m3s', 3723.0),
+    ('1.5s', 1.5),
+    ('2m', 120.0),
+    ('0.25', 0.25),
+    (' 3s ', 3.0),
+    ('', None),
+    (None, None),
+    ('soon', None),
+])
+def test_parse_reset(value, seconds):
+    assert parse_reset(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_limits_wait_for_window_reset():
+    limits = ModelLimits()
+    assert limits.wait_time(100) == 0
+    limits.update({'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '2s',
+                   'x-ratelimit-remaining-tokens': '50', 'x-ratelimit-reset-tokens': '5s'})
+    assert 0 < limits.wait_time(0) <= 2
+    assert 2 < limits.wait_time(100) <= 5
+
+
+def test_reserve_counts_down_locally():
+    limits = ModelLimits()
+    limits.update({'x-ratelimit-remaining-requests': '1', 'x-ratelimit-reset-requests': '10s'})
+    assert limits.wait_time() == 0
+    limits.reserve()
+    assert limits.wait_time() > 0
+
+
+def test_light_requests_leave_reserved_slots():
+    scheduler = OpenAIScheduler(None, max_concurrency=2, reserved_heavy=1)
+    deadline = time.monotonic() + 1
+    release_light = scheduler._acquire(False, deadline)
+    with pytest.raises(SchedulerBusy):
+        scheduler._acquire(False, deadline=time.monotonic())
+    release_heavy = scheduler._acquire(True, deadline)
+    release_light()
+    release_heavy()
+
+
+def test_stream_slot_released_when_drained():
+    scheduler = OpenAIScheduler(None, max_concurrency=1, reserved_heavy=0)
+    stream = HeldStream(iter([1, 2]), scheduler._acquire(True, time.monotonic() + 1))
+    assert list(stream) == [1, 2]
+    scheduler._acquire(True, time.monotonic())()
+
+
+def test_stream_slot_released_when_closed_unread():
+    scheduler = OpenAIScheduler(None, max_concurrency=1, reserved_heavy=0)
+    stream = HeldStream(iter([1, 2]), scheduler._acquire(True, time.monotonic() + 1))
+    with pytest.raises(SchedulerBusy):
+        scheduler._acquire(True, time.monotonic())
+    stream.close()
+    stream.close()  # released only once
+    scheduler._acquire(True, time.monotonic())()
+
+
+def test_stream_slot_released_when_dropped():
+    scheduler = OpenAIScheduler(None, max_concurrency=1, reserved_heavy=0)
+    HeldStream(iter([1]), scheduler._acquire(True, time.monotonic() + 1))
+    scheduler._acquire(True, time.monotonic())()
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+import prefetch
+from cache import Cache, MemoryBackend
+from prefetch import LeaderLock, Prefetcher, RateBudget
+
+
+class Gone(Exception):
+    negative_ttl = 120
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prefetch.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def _prefetcher(fetch, **kwargs):
+    return Prefetcher(Cache(MemoryBackend()), lambda key: (60, fetch, 'api', 1), {}, static_keys=['k'], **kwargs)
+
+
+def test_failed_key_is_backed_off_exponentially(clock):
+    calls = []
+
+    def fetch():
+        calls.append(clock[0])
+        raise RuntimeError('down')
+
+    p = _prefetcher(fetch)
+    p.run_once()
+    assert p._failures['k'] == (1, clock[0] + 5)
+    p.run_once()
+    assert len(calls) == 1  # still backing off
+
+    clock[0] += 5
+    p.run_once()
+    assert len(calls) == 2
+    assert p._failures['k'] == (2, clock[0] + 10)
+
+
+def test_backoff_is_capped(clock):
+    def fetch():
+        raise RuntimeError('down')
+
+    p = _prefetcher(fetch, max_backoff=30)
+    for _ in range(8):
+        clock[0] += 60
+        p.run_once()
+    assert p._failures['k'] == (8, clock[0] + 30)
+
+
+def test_backoff_honours_negative_ttl(clock):
+    def fetch():
+        raise Gone('unknown city')
+
+    p = _prefetcher(fetch)
+    p.run_once()
+    assert p._failures['k'] == (1, clock[0] + 120)
+
+
+def test_success_clears_backoff(clock):
+    results = [RuntimeError('down'), {'ok': True}]
+
+    def fetch():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    p = _prefetcher(fetch)
+    p.run_once()
+    clock[0] += 5
+    assert p.run_once() == ['k']
+    assert 'k' not in p._failures
+
+
+def test_budget_limits_fetches():
+    budget = RateBudget(2)
+    assert budget.try_take() and budget.try_take()
+    assert not budget.try_take()
+
+
+def test_leader_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / 'prefetch.lock')
+    first, second = LeaderLock(path), LeaderLock(path)
+    assert first.acquire()
+    assert first.acquire()  # already held
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_only_leader_runs_passes(tmp_path):
+    path = str(tmp_path / 'prefetch.lock')
+    holder = LeaderLock(path)
+    assert holder.acquire()
+    fetched = []
+    p = Prefetcher(Cache(MemoryBackend()), lambda key: (60, lambda: fetched.append(key) or 1, 'api', 1), {},
+                   static_keys=['k'], interval=0.01, leader=LeaderLock(path))
+    p.start()
+    time.sleep(0.05)
+    assert fetched == []
+    holder.release()
+    deadline = time.time() + 2
+    while not fetched and time.time() < deadline:
+        time.sleep(0.01)
+    p.stop()
+    assert fetched == ['k']
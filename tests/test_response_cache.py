@@ -0,0 +1,67 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = ResponseCache()
+    cache.set('What is Python?', 'professional', 'm', 'a language')
+    assert cache.get('what is python', 'professional', 'm') == 'a language'
+    assert cache.stats['hits_exact'] == 1
+
+
+def test_entries_expire(clock):
+    cache = ResponseCache(ttl=60)
+    cache.set('hello', 'casual', 'm', 'hi')
+    cache.set('bye', 'casual', 'm', 'later', ttl=600)
+    clock[0] += 61
+    assert cache.get('hello', 'casual', 'm') is None
+    assert cache.get('bye', 'casual', 'm') == 'later'
+    assert cache.stats['expired'] == 1
+    assert cache.stats['misses'] == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set('one', 't', 'm', 1)
+    cache.set('two', 't', 'm', 2)
+    cache.get('one', 't', 'm')
+    cache.set('three', 't', 'm', 3)
+    assert cache.get('two', 't', 'm') is None
+    assert cache.get('one', 't', 'm') == 1
+    assert cache.get('three', 't', 'm') == 3
+    assert cache.stats['evictions'] == 1
+
+
+def test_exact_match_is_scoped_to_tone_and_model():
+    cache = ResponseCache()
+    cache.set('hello', 'casual', 'm', 'hi')
+    assert cache.get('hello', 'professional', 'm') is None
+    assert cache.get('hello', 'casual', 'other') is None
+
+
+@pytest.mark.skipif(not response_cache.HAS_NUMPY, reason='similarity tier needs NumPy')
+def test_similar_message_hits_within_scope():
+    cache = ResponseCache(similarity_threshold=0.8)
+    cache.set('how do I reverse a list in python', 'professional', 'm', 'use reversed()')
+    assert cache.get('how do i reverse a list in python please', 'professional', 'm') == 'use reversed()'
+    assert cache.stats['hits_similar'] == 1
+    assert cache.get('how do i reverse a list in python please', 'casual', 'm') is None
+    assert cache.get('how do i reverse a list in python please', 'professional', 'other') is None
+    assert cache.get('what is the capital of France', 'professional', 'm') is None
+
+
+@pytest.mark.skipif(not response_cache.HAS_NUMPY, reason='similarity tier needs NumPy')
+def test_similar_match_skips_expired_entries(clock):
+    cache = ResponseCache(ttl=60, similarity_threshold=0.8)
+    cache.set('how do I reverse a list in python', 'professional', 'm', 'use reversed()')
+    clock[0] += 61
+    assert cache.get('how do i reverse a list in python please', 'professional', 'm') is None
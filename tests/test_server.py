@@ -0,0 +1,69 @@
+import os
+
+os.environ.setdefault('PREFETCH_ENABLED', '0')
+os.environ.setdefault('CONVERSATIONS_ENABLED', '0')
+
+import server  # noqa: E402
+
+
+def test_route_model_sends_short_messages_to_light_model():
+    assert server._route_model('hi there!', 'gpt-4.1') == (server.OPENAI_LIGHT_MODEL, False)
+
+
+def test_route_model_keeps_pinned_model_for_short_messages():
+    assert server._route_model('hi there!', 'gpt-4.1', pinned=True) == ('gpt-4.1', False)
+
+
+def test_route_model_keeps_heavy_model_for_long_messages():
+    message = 'Please compare the economic policies of the last three governments in detail ' * 3
+    assert server._route_model(message, 'gpt-4.1') == ('gpt-4.1', True)
+
+
+def test_route_model_disabled(monkeypatch):
+    monkeypatch.setenv('CHAT_ROUTING', '0')
+    assert server._route_model('hi', 'gpt-4.1') == ('gpt-4.1', True)
+
+
+def test_fast_time_uses_client_zone():
+    zone = server._client_zone({'timezone': 'Asia/Tokyo'})
+    intent, reply = server._fast_path('what time is it?', zone)
+    assert intent == 'time' and reply.endswith('(Asia/Tokyo).')
+
+
+def test_fast_time_without_zone_is_left_to_the_model():
+    assert server._client_zone({'timezone': 'Mars/Olympus'}) is None
+    assert server._fast_path('what time is it?') is None
+    assert server._fast_path("what's the date today?") is None
+    assert server._fast_path('what time is it in Tokyo?')[0] == 'time'
+
+
+def test_batch_rejects_unknown_params():
+    result = server._run_batch_query('q', {'type': 'time', 'params': {'zone': 'UTC'}})
+    assert result['status'] == 400 and result['error']['error'] == 'bad params'
+
+
+def test_batch_handler_type_error_is_a_server_error(monkeypatch):
+    def broken(tz):
+        return len(None)
+
+    monkeypatch.setitem(server._BATCH_FEEDS, 'time', broken)
+    assert server._run_batch_query('q', {'type': 'time', 'params': {'tz': 'UTC'}})['status'] == 500
+
+
+def test_static_page_revalidates_with_etag():
+    client = server.app.test_client()
+    first = client.get('/')
+    assert first.status_code == 200 and first.headers['ETag']
+    again = client.get('/', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+
+def test_cached_api_response_revalidates_with_etag(monkeypatch):
+    monkeypatch.setattr(server, '_fetch_weather', lambda city: {'city': city, 'temp': 21})
+    client = server.app.test_client()
+    first = client.get('/api/weather?city=Etagville')
+    assert first.status_code == 200 and first.get_json()['temp'] == 21
+    etag = first.headers['ETag']
+    assert client.get('/api/weather?city=Etagville', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/weather?city=Etagville', headers={'If-None-Match': 'W/"other"'}).status_code == 200
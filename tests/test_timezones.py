@@ -0,0 +1,58 @@
+import pytest
+
+import timezones
+
+
+@pytest.mark.parametrize('place, zone, code', [
+    # exact IANA names resolve to themselves, whatever the index says
+    ('Europe/London', 'Europe/London', None),
+    ('CET', 'CET', None),
+    ('EST', 'EST', None),
+    ('EST5EDT', 'EST5EDT', None),
+    ('Zulu', 'Zulu', None),
+    ('Japan', 'Japan', None),
+    ('UTC', 'UTC', None),
+    ('Etc/GMT+5', 'Etc/GMT+5', None),
+    # normalized names, aliases and countries
+    ('europe/london', 'Europe/London', None),
+    ('new york', 'America/New_York', None),
+    ('kyiv', 'Europe/Kyiv', None),
+    ('cet', 'CET', None),
+    ('nyc', 'America/New_York', None),
+    ('la', 'America/Los_Angeles', None),
+    ('japan', 'Asia/Tokyo', 'JP'),
+    ('JPN', 'Asia/Tokyo', 'JP'),
+    ('uk', 'Europe/London', 'GB'),
+    ('Australia', 'Australia/Sydney', 'AU'),
+    ('  United   States ', 'America/New_York', 'US'),
+    ('nowhere', None, None),
+])
+def test_resolve(place, zone, code):
+    assert timezones.resolve(place) == (zone, code)
+
+
+@pytest.mark.parametrize('name, code', [
+    ('LA', 'LA'),
+    ('la', 'LA'),
+    ('Laos', 'LA'),
+    ('jp', 'JP'),
+    ('JPN', 'JP'),
+    ('uk', 'GB'),
+    ('england', 'GB'),
+    ('united states', 'US'),
+    ('nyc', None),
+    ('xx', None),
+])
+def test_country_code_ignores_city_aliases(name, code):
+    assert timezones.country_code(name) == code
+
+
+def test_zone_for_country_prefers_primary_zone():
+    assert timezones.zone_for_country('BR') == 'America/Sao_Paulo'
+    assert timezones.zone_for_country('NG') == 'Africa/Lagos'
+    assert timezones.zone_for_country('XX') is None
+
+
+def test_zone_is_cached():
+    assert timezones.zone('Asia/Tokyo') is timezones.zone('Asia/Tokyo')
+    assert timezones.zone('Asia/Tokyo').key == 'Asia/Tokyo'
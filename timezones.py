@@ -0,0 +1,178 @@
+"""Country and place -> IANA time zone lookups.
+
+TimezoneIndex is built once into a dict from normalized names to zones:
+  - every IANA zone name ("europe/london", "cet"), and its city part ("london");
+  - every ISO 3166 country from tzdata's zone.tab, by alpha-2 and alpha-3
+    code and by its pycountry names ("jp", "jpn", "japan");
+  - a table of common aliases ("uk", "nyc", "mumbai", "beijing").
+An exact IANA name ("EST", "Europe/London") always resolves to itself first;
+everything else is then one dict hit. ZoneInfo objects are created once per zone.
+The index is built on first use by get_index(), not at import.
+"""
+import threading
+from importlib import resources
+from zoneinfo import ZoneInfo, available_timezones
+
+# zone.tab orders a country's zones by region, not population, so name the
+# obvious default where its first entry isn't it
+PRIMARY_ZONES = {
+    'AU': 'Australia/Sydney',
+    'BR': 'America/Sao_Paulo',
+    'CA': 'America/Toronto',
+    'RU': 'Europe/Moscow',
+    'UA': 'Europe/Kyiv',
+    'UZ': 'Asia/Tashkent',
+}
+COUNTRY_ALIASES = {
+    'uk': 'GB', 'england': 'GB', 'scotland': 'GB', 'wales': 'GB', 'britain': 'GB', 'great britain': 'GB',
+    'usa': 'US', 'america': 'US', 'united states': 'US', 'uae': 'AE', 'russia': 'RU', 'south korea': 'KR',
+    'north korea': 'KP', 'iran': 'IR', 'vietnam': 'VN', 'syria': 'SY', 'turkey': 'TR', 'bolivia': 'BO',
+    'venezuela': 'VE', 'tanzania': 'TZ', 'taiwan': 'TW', 'laos': 'LA', 'moldova': 'MD', 'czechia': 'CZ',
+    'ivory coast': 'CI', 'drc': 'CD', 'holland': 'NL',
+}
+# cities that aren't the name of a zone of their own
+CITY_ALIASES = {
+    'nyc': 'America/New_York', 'new york city': 'America/New_York', 'washington': 'America/New_York',
+    'washington dc': 'America/New_York', 'dc': 'America/New_York', 'boston': 'America/New_York',
+    'miami': 'America/New_York', 'atlanta': 'America/New_York', 'philadelphia': 'America/New_York',
+    'la': 'America/Los_Angeles', 'san francisco': 'America/Los_Angeles', 'sf': 'America/Los_Angeles',
+    'seattle': 'America/Los_Angeles', 'las vegas': 'America/Los_Angeles', 'san diego': 'America/Los_Angeles',
+    'houston': 'America/Chicago', 'dallas': 'America/Chicago', 'austin': 'America/Chicago',
+    'san antonio': 'America/Chicago', 'montreal': 'America/Toronto', 'ottawa': 'America/Toronto',
+    'calgary': 'America/Edmonton', 'rio': 'America/Sao_Paulo', 'rio de janeiro': 'America/Sao_Paulo',
+    'brasilia': 'America/Sao_Paulo', 'manchester': 'Europe/London', 'liverpool': 'Europe/London',
+    'birmingham': 'Europe/London', 'edinburgh': 'Europe/London', 'glasgow': 'Europe/London',
+    'barcelona': 'Europe/Madrid', 'munich': 'Europe/Berlin', 'frankfurt': 'Europe/Berlin',
+    'hamburg': 'Europe/Berlin', 'milan': 'Europe/Rome', 'naples': 'Europe/Rome', 'geneva': 'Europe/Zurich',
+    'st petersburg': 'Europe/Moscow', 'saint petersburg': 'Europe/Moscow', 'kiev': 'Europe/Kyiv',
+    'mumbai': 'Asia/Kolkata', 'bombay': 'Asia/Kolkata', 'delhi': 'Asia/Kolkata', 'new delhi': 'Asia/Kolkata',
+    'bangalore': 'Asia/Kolkata', 'bengaluru': 'Asia/Kolkata', 'chennai': 'Asia/Kolkata',
+    'hyderabad': 'Asia/Kolkata', 'calcutta': 'Asia/Kolkata', 'beijing': 'Asia/Shanghai',
+    'shenzhen': 'Asia/Shanghai', 'guangzhou': 'Asia/Shanghai', 'saigon': 'Asia/Ho_Chi_Minh',
+    'hanoi': 'Asia/Bangkok', 'osaka': 'Asia/Tokyo', 'kyoto': 'Asia/Tokyo', 'abu dhabi': 'Asia/Dubai',
+    'mecca': 'Asia/Riyadh', 'jeddah': 'Asia/Riyadh', 'tel aviv': 'Asia/Jerusalem',
+    'abuja': 'Africa/Lagos', 'ibadan': 'Africa/Lagos', 'port harcourt': 'Africa/Lagos',
+    'kano': 'Africa/Lagos', 'cape town': 'Africa/Johannesburg', 'durban': 'Africa/Johannesburg',
+    'pretoria': 'Africa/Johannesburg', 'kumasi': 'Africa/Accra', 'canberra': 'Australia/Sydney',
+    'wellington': 'Pacific/Auckland',
+}
+
+
+def _zone_tab():
+    try:
+        return resources.files('tzdata').joinpath('zoneinfo', 'zone.tab').read_text(encoding='utf-8')
+    except (ModuleNotFoundError, FileNotFoundError):
+        with open('/usr/share/zoneinfo/zone.tab', encoding='utf-8') as f:
+            return f.read()
+
+
+def normalize(name):
+    return ' '.join(name.replace('_', ' ').split()).lower()
+
+
+class TimezoneIndex:
+    def __init__(self):
+        import pycountry
+
+        self.country_zones = {}  # alpha_2 -> [zone, ...]
+        for line in _zone_tab().splitlines():
+            if line and not line.startswith('#'):
+                fields = line.split('\t')
+                self.country_zones.setdefault(fields[0], []).append(fields[2])
+
+        zones = sorted(available_timezones())
+        self.zone_names = set(zones)
+
+        # country names and codes -> alpha_2, kept apart from places so that
+        # country lookups never hit a city alias ("la" is Laos here)
+        countries = {}
+        for alias, code in COUNTRY_ALIASES.items():
+            countries[alias] = code
+        for code in self.country_zones:
+            countries.setdefault(code.lower(), code)
+            country = pycountry.countries.get(alpha_2=code)
+            if country is None:
+                continue
+            countries.setdefault(country.alpha_3.lower(), code)
+            for attr in ('name', 'common_name', 'official_name'):
+                if hasattr(country, attr):
+                    countries.setdefault(normalize(getattr(country, attr)), code)
+        self.countries = countries
+
+        # name -> (zone, alpha_2 or None); earlier entries win
+        places = {}
+        for name in zones:
+            # legacy single-word links ("Japan", "Egypt") are indexed last, below, so they
+            # resolve as countries; their exact names still match via zone_names
+            if '/' in name or name in ('UTC', 'GMT'):
+                places[normalize(name)] = (name, None)
+        # explicit aliases beat country codes, so "la" is Los Angeles rather than Laos
+        for alias, code in COUNTRY_ALIASES.items():
+            places.setdefault(alias, (self.primary_zone(code), code))
+        for alias, zone in CITY_ALIASES.items():
+            places.setdefault(alias, (zone, None))
+        for name, code in countries.items():
+            places.setdefault(name, (self.primary_zone(code), code))
+        # canonical zones first, so e.g. "kyiv" maps to Europe/Kyiv rather than a link
+        canonical = [z for zs in self.country_zones.values() for z in zs]
+        for name in canonical + zones:
+            if '/' in name and not name.startswith(('Etc/', 'SystemV/')):
+                places.setdefault(normalize(name.rsplit('/', 1)[1]), (name, None))
+        for name in zones:
+            places.setdefault(normalize(name), (name, None))
+        self.places = places
+        self._zoneinfo = {}
+        self._lock = threading.Lock()
+
+    def primary_zone(self, code):
+        zones = self.country_zones.get(code)
+        return PRIMARY_ZONES.get(code) or (zones[0] if zones else None)
+
+    def resolve(self, place):
+        """Return (zone, country_code) for an IANA zone, country, city or alias.
+        zone is None if the place is unknown; country_code is None unless the place was a country.
+        """
+        if place in self.zone_names:
+            return place, None
+        return self.places.get(normalize(place), (None, None))
+
+    def country_code(self, name):
+        return self.countries.get(normalize(name))
+
+    def zone(self, key):
+        """Cached ZoneInfo for an IANA zone name."""
+        zi = self._zoneinfo.get(key)
+        if zi is None:
+            with self._lock:
+                zi = self._zoneinfo.setdefault(key, ZoneInfo(key))
+        return zi
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TimezoneIndex()
+    return _index
+
+
+def resolve(place):
+    return get_index().resolve(place)
+
+
+def zone(key):
+    return get_index().zone(key)
+
+
+def country_code(name):
+    """ISO alpha-2 code for a country code, alpha-3 code or name; None if unknown."""
+    return get_index().country_code(name)
+
+
+def zone_for_country(code):
+    return get_index().primary_zone(code)